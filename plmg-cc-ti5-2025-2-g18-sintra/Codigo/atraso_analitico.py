@@ -0,0 +1,81 @@
+# atraso_analitico.py
+# Estimativa analítica (fórmula fechada) da espera média numa aproximação isolada de
+# tempo fixo, usada como substituto barato do Simulador na triagem do OtimizadorGA
+# (OtimizadorGA(triagem=...)).
+#
+# Modelo: atraso uniforme de Webster mais o termo incremental do HCM, que continua
+# válido com a via supersaturada (x >= 1) dentro de um horizonte finito:
+#
+#   d1 = 0.5 C (1 - g/C)^2 / (1 - min(1, x) g/C)
+#   d2 = 900 T [(x - 1) + sqrt((x - 1)^2 + 4x / (c T))] / max(1, x)   (T em h, c em veíc./h)
+#
+# com os parâmetros do Simulador: chegadas de Poisson com média mu_chegada entre
+# veículos e um veículo a cada T_passa segundos enquanto o sinal está verde. O primeiro
+# sai T_reage + T_passa depois da abertura e o último que sai ainda no verde termina
+# T_passa depois do fim, então o verde efetivo é g = verde - T_reage + T_passa. A divisão
+# por max(1, x) acompanha a métrica do Simulador, que só conta a espera de quem passou:
+# supersaturada, a fila residual no fim do horizonte fica de fora.
+#
+# Serve para ordenar candidatos, não para substituir a simulação: não vê pelotões,
+# offsets nem movimentos entre vias.
+import math
+from typing import Dict, Optional, Sequence, Tuple
+
+# mesmos valores que o OtimizadorGA passa ao Simulador
+T_REAGE = 4.1
+T_PASSA = 3.4
+
+
+def atraso_medio(mu_chegada: Optional[float], verde: float, vermelho: float,
+                 horizonte: float = 3600.0, T_reage: float = T_REAGE,
+                 T_passa: float = T_PASSA) -> float:
+    """Espera média estimada (s) de um veículo na via ao longo de `horizonte` segundos."""
+    if mu_chegada is None or mu_chegada <= 0:
+        return 0.0
+    ciclo = verde + vermelho
+    if ciclo <= 0:
+        return math.inf
+    g = max(0.0, verde - T_reage + T_passa)
+    if g <= 0.0:
+        # sem verde útil a fila só cresce: espera média ~ metade do horizonte
+        return ciclo + horizonte / 2.0
+    fracao_verde = g / ciclo
+    capacidade = 3600.0 * fracao_verde / T_passa       # veículos/h
+    demanda = 3600.0 / mu_chegada                      # veículos/h
+    x = demanda / capacidade
+    d1 = 0.5 * ciclo * (1.0 - fracao_verde) ** 2 / (1.0 - min(1.0, x) * fracao_verde)
+    T = horizonte / 3600.0
+    d2 = 900.0 * T * ((x - 1.0) + math.sqrt((x - 1.0) ** 2 + 4.0 * x / (capacidade * T)))
+    d2 /= max(1.0, x)
+    return d1 + d2
+
+
+def fitness_analitico(planos: Dict[str, Tuple[float, float, float]],
+                      mu_por_via: Dict[str, Optional[float]], horizonte: float) -> float:
+    """Maior espera média estimada entre as vias (o mesmo objetivo do OtimizadorGA).
+
+    planos: {via: (verde, vermelho, offset)}, como OtimizadorGA._planos; o offset não
+    entra no modelo.
+    """
+    return max((atraso_medio(mu_por_via[vid], verde, vermelho, horizonte)
+                for vid, (verde, vermelho, _) in planos.items()), default=math.inf)
+
+
+def pares_concordantes(estimados: Sequence[float], medidos: Sequence[float]) -> Tuple[int, int]:
+    """(pares concordantes, pares comparáveis) entre duas ordenações (base do tau de Kendall).
+
+    Um par é comparável quando não há empate em nenhuma das duas listas, e concordante
+    quando as duas colocam os dois itens na mesma ordem.
+    """
+    concordantes = comparaveis = 0
+    n = len(estimados)
+    for i in range(n):
+        for j in range(i + 1, n):
+            de = estimados[i] - estimados[j]
+            dm = medidos[i] - medidos[j]
+            if de == 0 or dm == 0:
+                continue
+            comparaveis += 1
+            if (de > 0) == (dm > 0):
+                concordantes += 1
+    return concordantes, comparaveis
@@ -0,0 +1,360 @@
+# benchmark.py
+# Medições de desempenho do simulador e do otimizador (sem rede, sementes fixas).
+#
+#   python benchmark.py                      -> roda todos os alvos
+#   python benchmark.py eventos ga           -> só os alvos indicados
+#   python benchmark.py --saida atual.json   -> grava os resultados em JSON
+#   python benchmark.py --comparar base.json atual.json
+#
+# Alvos:
+#   fila      aproximação supersaturada: custo da fila vs horizonte
+#   eventos   eventos/segundo do laço do Simulador por taxa de chegada e horizonte
+#   ga        avaliações/segundo do OtimizadorGA no caso do artigo (run_otimizador.py)
+#   ciclo     latência de uma otimização do ciclo de controle (calcular_tempos_otimizados)
+#   memoria   pico de memória (tracemalloc) do Simulador e do GA
+#   operadores  custo dos operadores do GA por geração: população em lista vs matriz (NumPy)
+#   tabela    latência do ciclo de controle consultando a tabela de planos (tabela_planos.py)
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import random
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+from collections import deque
+
+from simulacao import Semaforo, Via, Simulador
+from otimizacao import OtimizadorGA
+from sintra_adapter import build_vias_from_input
+import sintra_optimizer
+
+# caso 1 do artigo, o mesmo de run_otimizador.py
+CASO_ARTIGO = {
+    "vias": [
+        {"id": "v1", "mu_chegada": 8.8, "verde": 33, "vermelho": 22},
+        {"id": "v2", "mu_chegada": 18.5, "verde": 22, "vermelho": 33}
+    ],
+    "movimentos": [],
+    "deslocamentos": {}
+}
+
+
+def _vias_supersaturadas(mu=3.0, verde=10.0, vermelho=110.0):
+    # chegadas a cada ~3 s contra ~2 partidas por ciclo de 120 s: a fila só cresce
+    sem = Semaforo(id='A', verde=verde, vermelho=vermelho)
+    return {'A': Via(id='A', semaforo=sem, mu_chegada=mu)}
+
+
+def bench_fila_saturada(horizontes=(3600, 4*3600, 12*3600, 24*3600), seed=0):
+    """Roda o Simulador numa aproximação supersaturada para horizontes crescentes.
+
+    Com a fila em deque o tempo cresce linearmente com o horizonte, mesmo com a fila
+    chegando a dezenas de milhares de veículos.
+    """
+    resultados = []
+    for horizonte in horizontes:
+        random.seed(seed)
+        vias = _vias_supersaturadas()
+        sim = Simulador(vias=vias, movimentos=[], deslocamentos={}, sim_time=horizonte)
+        t0 = time.perf_counter()
+        sim.run()
+        dt = time.perf_counter() - t0
+        resultados.append({'horizonte': horizonte, 'segundos': dt,
+                           'fila_final': len(vias['A'].fila),
+                           'passados': sim.num_passados['A']})
+    return resultados
+
+
+def bench_fila_operacoes(tamanhos=(1000, 10000, 50000)):
+    """Compara list.pop(0) e deque.popleft() no padrão de uso da fila de uma via
+    (enche durante o vermelho, esvazia um veículo por vez)."""
+    resultados = []
+    for n in tamanhos:
+        linha = {'tamanho': n}
+        for nome, fabrica, retirar in (('list', list, lambda f: f.pop(0)),
+                                       ('deque', deque, lambda f: f.popleft())):
+            fila = fabrica()
+            t0 = time.perf_counter()
+            for i in range(n):
+                fila.append(float(i))
+            while fila:
+                retirar(fila)
+            linha[nome] = time.perf_counter() - t0
+        resultados.append(linha)
+    return resultados
+
+
+def bench_eventos(taxas=(3.0, 8.8, 20.0), horizontes=(3600, 24*3600), seed=0, repeticoes=3):
+    """Mede eventos processados por segundo pelo Simulador (duas vias, ciclo 60 s).
+
+    Usa o melhor de `repeticoes` execuções para reduzir o ruído da máquina.
+    """
+    resultados = []
+    for mu in taxas:
+        for horizonte in horizontes:
+            melhor = None
+            for _ in range(repeticoes):
+                random.seed(seed)
+                vias = {vid: Via(id=vid, semaforo=Semaforo(id=vid, verde=verde, vermelho=60 - verde),
+                                 mu_chegada=mu)
+                        for vid, verde in (('v1', 33.0), ('v2', 22.0))}
+                sim = Simulador(vias=vias, movimentos=[], deslocamentos={}, sim_time=horizonte)
+                t0 = time.perf_counter()
+                sim.run()
+                dt = time.perf_counter() - t0
+                if melhor is None or dt < melhor:
+                    melhor = dt
+            resultados.append({'mu_chegada': mu, 'horizonte': horizonte, 'eventos': sim.num_eventos,
+                               'segundos': melhor, 'eventos_por_segundo': sim.num_eventos / melhor})
+    return resultados
+
+
+def _ga_artigo(seed, **kwargs):
+    params = dict(pop_size=20, generations=5, sim_time=3600, seed=seed)
+    params.update(kwargs)
+    return OtimizadorGA(rede_vias=build_vias_from_input(CASO_ARTIGO), desloc={},
+                        movimentos=[], **params)
+
+
+def bench_ga(seed=0, repeticoes=3):
+    """Avaliações de fitness por segundo no caso do artigo (pop 20, 5 gerações, 1 h).
+
+    O cache é desligado para medir o custo real de cada avaliação.
+    """
+    melhor = None
+    for _ in range(repeticoes):
+        ga = _ga_artigo(seed)
+        t0 = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            _, fit = ga.run()
+        dt = time.perf_counter() - t0
+        if melhor is None or dt < melhor:
+            melhor = dt
+    return {'avaliacoes': ga.num_avaliacoes, 'segundos': melhor,
+            'avaliacoes_por_segundo': ga.num_avaliacoes / melhor, 'fitness': fit}
+
+
+def bench_ciclo(contagens=((0, 0), (3, 1), (8, 8), (20, 2)), repeticoes=5, seed=0):
+    """Latência ponta a ponta de calcular_tempos_otimizados, como no control_thread."""
+    resultados = []
+    for cnt_s1, cnt_s2 in contagens:
+        tempos = []
+        for r in range(repeticoes):
+            t0 = time.perf_counter()
+            with contextlib.redirect_stdout(io.StringIO()):
+                sintra_optimizer.calcular_tempos_otimizados({"S1": cnt_s1, "S2": cnt_s2},
+                                                            seed=seed + r)
+            tempos.append(time.perf_counter() - t0)
+        resultados.append({'contagens': f"{cnt_s1},{cnt_s2}",
+                           'mediana': statistics.median(tempos), 'max': max(tempos)})
+    return resultados
+
+
+def bench_memoria(seed=0):
+    """Pico de memória alocada em Python durante uma simulação de 24 h e um GA."""
+    resultados = {}
+    random.seed(seed)
+    vias = build_vias_from_input(CASO_ARTIGO)
+    tracemalloc.start()
+    Simulador(vias=vias, movimentos=[], deslocamentos={}, sim_time=24*3600).run()
+    resultados['simulador_24h_bytes'] = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    tracemalloc.start()
+    with contextlib.redirect_stdout(io.StringIO()):
+        _ga_artigo(seed).run()
+    resultados['ga_artigo_bytes'] = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return resultados
+
+
+def bench_operadores(n_intersecoes=100, vias_por_intersecao=3, pop_size=200, geracoes=5, seed=0):
+    """Seleção + cruzamento + mutação de uma geração, sem avaliar (rede grande, pop 200).
+
+    Compara os operadores por indivíduo (populacao='lista') com os de
+    operadores_vetorizados.py (populacao='matriz'), nas duas codificações. No modo matriz
+    entra também a conversão linha -> indivíduo, que o GA faz antes de avaliar.
+    """
+    from operadores_vetorizados import OperadoresMatriz
+    entrada = {"vias": [], "movimentos": [], "deslocamentos": {}}
+    intersecoes = {}
+    for i in range(n_intersecoes):
+        nomes = [f"i{i}v{j}" for j in range(vias_por_intersecao)]
+        intersecoes[f"I{i}"] = nomes
+        entrada["vias"].extend({"id": n, "mu_chegada": 10.0, "verde": 20, "vermelho": 20}
+                               for n in nomes)
+    resultados = []
+    for codificacao in ('verdes', 'fases'):
+        ga = OtimizadorGA(rede_vias=build_vias_from_input(entrada), desloc={}, movimentos=[],
+                          intersecoes=intersecoes, pop_size=pop_size, seed=seed,
+                          codificacao=codificacao)
+        rng = random.Random(seed)
+        populacao = [(rng.uniform(0, 1000), ga.random_individual()) for _ in range(pop_size)]
+        m = pop_size - 2
+        t0 = time.perf_counter()
+        for _ in range(geracoes):
+            filhos = []
+            for _ in range(m):
+                filho = ga.crossover(ga.tournament_select(populacao)[1],
+                                     ga.tournament_select(populacao)[1])
+                ga.mutate(filho)
+                filhos.append(filho)
+        lista = (time.perf_counter() - t0) / geracoes
+        ops = OperadoresMatriz(ga, seed)
+        P, f = ops.matriz(populacao)
+        t0 = time.perf_counter()
+        for _ in range(geracoes):
+            ops.elite(f, 2)
+            filhos = [ops.indiv(linha) for linha in ops.filhos(P, f, m)]
+        matriz = (time.perf_counter() - t0) / geracoes
+        resultados.append({'codificacao': codificacao, 'genes': P.shape[1],
+                           'lista': lista, 'matriz': matriz})
+    return resultados
+
+
+def bench_tabela(contagens=((0, 0), (3, 1), (8, 8), (20, 2)), eixo=(0, 2, 5, 14), seed=0,
+                 repeticoes=2000):
+    """calcular_tempos_otimizados com tabela: grade pequena (construída aqui), consultas
+    em pontos da grade, interpoladas e saturadas (acima do eixo)."""
+    from tabela_planos import TabelaPlanos, construir
+    with tempfile.TemporaryDirectory() as pasta:
+        caminho = os.path.join(pasta, "planos.tab")
+        t0 = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            construir(caminho, 2, eixo, seed=seed)
+        construcao = time.perf_counter() - t0
+        tabela = TabelaPlanos.abrir(caminho)
+        resultados = []
+        for cnt_s1, cnt_s2 in contagens:
+            entrada = {"S1": cnt_s1, "S2": cnt_s2}
+            t0 = time.perf_counter()
+            for _ in range(repeticoes):
+                sintra_optimizer.calcular_tempos_otimizados(entrada, tabela=tabela)
+            resultados.append({'contagens': f"{cnt_s1},{cnt_s2}",
+                               'media': (time.perf_counter() - t0) / repeticoes})
+        tabela.fechar()
+    return {'construcao': construcao, 'celulas': len(eixo) ** 2, 'consultas': resultados}
+
+
+ALVOS = {
+    'fila': lambda: {'simulador': bench_fila_saturada(), 'operacoes': bench_fila_operacoes()},
+    'eventos': bench_eventos,
+    'ga': bench_ga,
+    'ciclo': bench_ciclo,
+    'memoria': bench_memoria,
+    'operadores': bench_operadores,
+    'tabela': bench_tabela,
+}
+
+
+def executar(alvos):
+    resultado = {'meta': {'python': sys.version.split()[0], 'plataforma': platform.platform(),
+                          'data': time.strftime('%Y-%m-%dT%H:%M:%S')}}
+    for alvo in alvos:
+        resultado[alvo] = ALVOS[alvo]()
+    return resultado
+
+
+def _metricas_planas(dados, prefixo=''):
+    # achata o JSON em {caminho: valor} para comparar duas execuções
+    planas = {}
+    if isinstance(dados, dict):
+        for k, v in dados.items():
+            planas.update(_metricas_planas(v, f"{prefixo}{k}."))
+    elif isinstance(dados, list):
+        for i, v in enumerate(dados):
+            planas.update(_metricas_planas(v, f"{prefixo}{i}."))
+    elif isinstance(dados, (int, float)) and not isinstance(dados, bool):
+        planas[prefixo[:-1]] = dados
+    return planas
+
+
+def comparar(arquivo_base, arquivo_novo):
+    with open(arquivo_base) as f:
+        base = _metricas_planas({k: v for k, v in json.load(f).items() if k != 'meta'})
+    with open(arquivo_novo) as f:
+        novo = _metricas_planas({k: v for k, v in json.load(f).items() if k != 'meta'})
+    for chave in sorted(base.keys() & novo.keys()):
+        b, n = base[chave], novo[chave]
+        razao = f"{n / b:6.2f}x" if b else "     -"
+        print(f"  {chave:<45} {b:>14.4g} -> {n:>14.4g}  {razao}")
+
+
+def _imprimir_eventos(resultados):
+    print("Laço de eventos do Simulador:")
+    for r in resultados:
+        print(f"  mu={r['mu_chegada']:>4}  horizonte={r['horizonte']:>6}s  eventos={r['eventos']:>7}  "
+              f"tempo={r['segundos']:.3f}s  {r['eventos_por_segundo']:,.0f} eventos/s")
+
+
+def _imprimir_fila(resultado):
+    print("Fila supersaturada (Simulador):")
+    for r in resultado['simulador']:
+        print(f"  horizonte={r['horizonte']:>6}s  tempo={r['segundos']:.3f}s  "
+              f"fila_final={r['fila_final']:>6}  passados={r['passados']}")
+    print("Operações de fila (enche e esvazia):")
+    for r in resultado['operacoes']:
+        print(f"  n={r['tamanho']:>6}  list.pop(0)={r['list']:.4f}s  "
+              f"deque.popleft()={r['deque']:.4f}s")
+
+
+def _imprimir_ga(r):
+    print(f"GA caso do artigo: {r['avaliacoes']} avaliações em {r['segundos']:.3f}s "
+          f"({r['avaliacoes_por_segundo']:.1f}/s)")
+
+
+def _imprimir_ciclo(resultados):
+    print("Ciclo de controle (calcular_tempos_otimizados):")
+    for r in resultados:
+        print(f"  S1,S2={r['contagens']:<5}  "
+              f"mediana={r['mediana']*1000:.1f}ms  max={r['max']*1000:.1f}ms")
+
+
+def _imprimir_memoria(r):
+    print("Pico de memória (tracemalloc):")
+    for k, v in r.items():
+        print(f"  {k:<22} {v / 1024:,.0f} KiB")
+
+
+def _imprimir_operadores(resultados):
+    print("Operadores do GA por geração (sem avaliação):")
+    for r in resultados:
+        print(f"  {r['codificacao']:<7} genes={r['genes']:>4}  lista={r['lista']*1000:.1f}ms  "
+              f"matriz={r['matriz']*1000:.1f}ms  ({r['lista'] / r['matriz']:.1f}x)")
+
+
+def _imprimir_tabela(r):
+    print(f"Tabela de planos: {r['celulas']} células construídas em {r['construcao']:.1f}s")
+    for c in r['consultas']:
+        print(f"  S1,S2={c['contagens']:<5}  consulta={c['media']*1e6:.1f}us")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmarks do simulador SINTRA")
+    parser.add_argument('alvos', nargs='*',
+                        help=f"alvos a executar: {', '.join(ALVOS)} ou todos (padrão)")
+    parser.add_argument('--saida', help="arquivo JSON onde gravar os resultados")
+    parser.add_argument('--comparar', nargs=2, metavar=('BASE', 'NOVO'),
+                        help="compara dois arquivos JSON gerados com --saida")
+    args = parser.parse_args()
+    if args.comparar:
+        comparar(*args.comparar)
+        sys.exit(0)
+    alvos = list(ALVOS) if not args.alvos or 'todos' in args.alvos else args.alvos
+    desconhecidos = [a for a in alvos if a not in ALVOS]
+    if desconhecidos:
+        parser.error(f"alvo desconhecido: {', '.join(desconhecidos)}")
+    resultado = executar(alvos)
+    impressoras = {'fila': _imprimir_fila, 'eventos': _imprimir_eventos, 'ga': _imprimir_ga,
+                   'ciclo': _imprimir_ciclo, 'memoria': _imprimir_memoria,
+                   'operadores': _imprimir_operadores, 'tabela': _imprimir_tabela}
+    for alvo in alvos:
+        impressoras[alvo](resultado[alvo])
+    if args.saida:
+        with open(args.saida, 'w') as f:
+            json.dump(resultado, f, indent=2)
+        print(f"Resultados gravados em {args.saida}")
@@ -0,0 +1,94 @@
+# carga_gps.py
+# Teste de carga local do /gps: simula aparelhos mandando pings e mede vazão e latência.
+#
+#   python carga_gps.py --url http://localhost:8000 --aparelhos 5000 --duracao 30
+#   python carga_gps.py --lote 200        -> usa /gps/batch com 200 pings por requisição
+#
+# Só usa a biblioteca padrão; cada conexão é uma thread com HTTP keep-alive.
+import argparse
+import http.client
+import json
+import random
+import statistics
+import threading
+import time
+from urllib.parse import urlparse
+
+
+def _conexao(url):
+    return http.client.HTTPConnection(url.hostname, url.port or 80, timeout=10)
+
+
+def _cliente(url, zonas, aparelhos, lote, fim, resultados, semente):
+    rng = random.Random(semente)
+    conn = _conexao(url)
+    latencias = []
+    pings = erros = 0
+    while time.perf_counter() < fim:
+        if lote > 1:
+            corpo = "\n".join(f"dev-{rng.randrange(aparelhos)},{rng.choice(zonas)}"
+                              for _ in range(lote))
+            caminho, tipo = "/gps/batch", "text/plain"
+        else:
+            corpo = json.dumps({"id": f"dev-{rng.randrange(aparelhos)}", "zone": rng.choice(zonas)})
+            caminho, tipo = "/gps", "application/json"
+        t0 = time.perf_counter()
+        try:
+            conn.request("POST", caminho, body=corpo, headers={"Content-Type": tipo})
+            resp = conn.getresponse()
+            resp.read()
+            if resp.status != 200:
+                erros += 1
+            else:
+                pings += max(1, lote)
+        except (OSError, http.client.HTTPException):
+            erros += 1
+            conn.close()
+            conn = _conexao(url)
+        latencias.append(time.perf_counter() - t0)
+    conn.close()
+    resultados.append((latencias, pings, erros))
+
+
+def executar(url, zonas, aparelhos, conexoes, duracao, lote, semente=0):
+    url = urlparse(url)
+    resultados = []
+    fim = time.perf_counter() + duracao
+    threads = [threading.Thread(target=_cliente,
+                                args=(url, zonas, aparelhos, lote, fim, resultados, semente + i))
+               for i in range(conexoes)]
+    inicio = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    decorrido = time.perf_counter() - inicio
+    latencias = sorted(l for r in resultados for l in r[0])
+    if not latencias:
+        return {'requisicoes': 0}
+    quantil = lambda q: latencias[min(len(latencias) - 1, int(q * len(latencias)))]
+    return {
+        'requisicoes': len(latencias),
+        'pings': sum(r[1] for r in resultados),
+        'erros': sum(r[2] for r in resultados),
+        'requisicoes_por_segundo': len(latencias) / decorrido,
+        'pings_por_segundo': sum(r[1] for r in resultados) / decorrido,
+        'latencia_media_ms': statistics.mean(latencias) * 1000,
+        'latencia_p50_ms': quantil(0.50) * 1000,
+        'latencia_p95_ms': quantil(0.95) * 1000,
+        'latencia_p99_ms': quantil(0.99) * 1000,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Carga sintética de pings GPS")
+    parser.add_argument('--url', default="http://localhost:8000")
+    parser.add_argument('--zonas', default="S1,S2")
+    parser.add_argument('--aparelhos', type=int, default=2000, help="ids distintos simulados")
+    parser.add_argument('--conexoes', type=int, default=32)
+    parser.add_argument('--duracao', type=float, default=10.0, help="segundos de carga")
+    parser.add_argument('--lote', type=int, default=1, help="pings por requisição (>1 usa /gps/batch)")
+    args = parser.parse_args()
+    res = executar(args.url, args.zonas.split(","), args.aparelhos, args.conexoes,
+                   args.duracao, args.lote)
+    print(json.dumps(res, indent=2))
@@ -0,0 +1,60 @@
+# estado_compartilhado.py
+# Processo de estado do modo de produção: serve um único RegistroVeiculos por socket
+# local (multiprocessing.managers), para que vários workers HTTP e o processo de
+# controle enxerguem os mesmos aparelhos e contagens.
+import time
+from multiprocessing.managers import BaseManager
+
+from registro_veiculos import RegistroVeiculos
+
+# métodos do registro acessíveis pelos proxies
+METODOS_REGISTRO = ('atualizar', 'atualizar_lote', 'atribuir_zonas', 'expirar',
+                    'contar', 'contar_todas', '__len__')
+
+
+class GerenciadorEstado(BaseManager):
+    pass
+
+
+_registro = None
+
+
+def _obter_registro():
+    return _registro
+
+
+def servir_estado(endereco, authkey, zonas, timeout, preparar=None):
+    """Corpo do processo de estado: bloqueia servindo o registro.
+
+    Cada conexão é atendida por uma thread do servidor; o lock interno do
+    RegistroVeiculos serializa as atualizações. preparar(registro), se dado, roda neste
+    processo antes de servir (ex.: instrumentar o lock para as métricas).
+    """
+    global _registro
+    _registro = RegistroVeiculos(zonas, timeout)
+    if preparar is not None:
+        preparar(_registro)
+    GerenciadorEstado.register('registro', callable=_obter_registro,
+                               exposed=METODOS_REGISTRO)
+    gerenciador = GerenciadorEstado(address=endereco, authkey=authkey)
+    servidor = gerenciador.get_server()
+    print(f"[ESTADO] Registro compartilhado em {endereco}")
+    servidor.serve_forever()
+
+
+def conectar_registro(endereco, authkey, tentativas=50, espera=0.1):
+    """Retorna um proxy do registro servido por servir_estado().
+
+    Tenta por alguns segundos, já que o processo de estado pode ainda estar subindo.
+    O proxy abre uma conexão por thread, podendo ser usado pelas threads do worker.
+    """
+    GerenciadorEstado.register('registro', exposed=METODOS_REGISTRO)
+    for i in range(tentativas):
+        try:
+            gerenciador = GerenciadorEstado(address=endereco, authkey=authkey)
+            gerenciador.connect()
+            return gerenciador.registro()
+        except (FileNotFoundError, ConnectionRefusedError):
+            if i == tentativas - 1:
+                raise
+            time.sleep(espera)
@@ -0,0 +1,108 @@
+# gravacao_gps.py
+# Gravação dos pings recebidos pelo /gps e /gps/batch, para reproduzir um dia de
+# produção depois (replay_gps.py).
+#
+# Arquivo binário só de acréscimo: cabeçalho CABECALHO e depois um registro por
+# requisição, com o instante de chegada e os pings como vieram (id e zona crus, antes da
+# validação, para o replay passar pela mesma ingestão):
+#
+#   LOTE = <d H>  (timestamp, n pings)   e, para cada ping,  <B B> + id + zona  (utf-8)
+#
+# Cada requisição vira um único os.write com O_APPEND: vários workers HTTP (modo de
+# produção) podem gravar no mesmo arquivo sem intercalar registros.
+import os
+import struct
+import threading
+from typing import Iterator, List, Sequence, Tuple
+
+MAGIC = b"SGPS"
+VERSAO = 1
+CABECALHO = struct.Struct("<4sH")
+LOTE = struct.Struct("<dH")
+PING = struct.Struct("<BB")
+MAX_PINGS = 0xFFFF
+
+
+def _texto(valor) -> bytes:
+    # ids e zonas maiores que 255 bytes são truncados (não existem na prática), sem
+    # partir um caractere UTF-8 de vários bytes
+    dados = ("" if valor is None else str(valor)).encode("utf-8")
+    if len(dados) > 255:
+        dados = dados[:255].decode("utf-8", "ignore").encode("utf-8")
+    return dados
+
+
+class GravadorPings:
+    def __init__(self, caminho: str):
+        self.caminho = caminho
+        try:
+            fd = os.open(caminho, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o644)
+        except FileExistsError:
+            # continua um arquivo existente (outro worker ou reinício do servidor)
+            with open(caminho, "rb") as f:
+                cabecalho = f.read(CABECALHO.size)
+            if cabecalho != CABECALHO.pack(MAGIC, VERSAO):
+                raise ValueError(f"{caminho}: não é uma gravação de pings (versão {VERSAO})")
+        else:
+            os.write(fd, CABECALHO.pack(MAGIC, VERSAO))
+            os.close(fd)
+        self._fd = os.open(caminho, os.O_WRONLY | os.O_APPEND)
+        self._lock = threading.Lock()
+        self.lotes = 0
+        self.pings = 0
+
+    def gravar(self, agora: float, registros: Sequence[Tuple[object, object]]):
+        """Acrescenta uma requisição: registros [(id, zona)] recebidos em `agora`."""
+        partes = []
+        for inicio in range(0, len(registros), MAX_PINGS):
+            parte = registros[inicio:inicio + MAX_PINGS]
+            partes.append(LOTE.pack(agora, len(parte)))
+            for vid, zona in parte:
+                vid, zona = _texto(vid), _texto(zona)
+                partes.append(PING.pack(len(vid), len(zona)))
+                partes.append(vid)
+                partes.append(zona)
+        dados = b"".join(partes)
+        with self._lock:
+            if self._fd is None:
+                return
+            os.write(self._fd, dados)
+            self.lotes += 1
+            self.pings += len(registros)
+
+    def fechar(self):
+        with self._lock:
+            if self._fd is not None:
+                os.close(self._fd)
+                self._fd = None
+
+
+def ler_pings(caminho: str) -> Iterator[Tuple[float, List[Tuple[str, str]]]]:
+    """Lê uma gravação: gera (timestamp, [(id, zona), ...]) por requisição, na ordem.
+
+    Um registro truncado no fim (servidor derrubado no meio de uma escrita) é ignorado.
+    """
+    with open(caminho, "rb") as f:
+        dados = f.read()
+    if dados[:CABECALHO.size] != CABECALHO.pack(MAGIC, VERSAO):
+        raise ValueError(f"{caminho}: não é uma gravação de pings (versão {VERSAO})")
+    pos = CABECALHO.size
+    fim = len(dados)
+    while pos + LOTE.size <= fim:
+        ts, n = LOTE.unpack_from(dados, pos)
+        p = pos + LOTE.size
+        registros = []
+        for _ in range(n):
+            if p + PING.size > fim:
+                return
+            n_id, n_zona = PING.unpack_from(dados, p)
+            p += PING.size
+            if p + n_id + n_zona > fim:
+                return
+            vid = dados[p:p + n_id].decode("utf-8", errors="replace")
+            p += n_id
+            zona = dados[p:p + n_zona].decode("utf-8", errors="replace")
+            p += n_zona
+            registros.append((vid, zona))
+        pos = p
+        yield ts, registros
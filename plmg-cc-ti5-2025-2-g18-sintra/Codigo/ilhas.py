@@ -0,0 +1,210 @@
+# ilhas.py
+# Modelo de ilhas para o OtimizadorGA: várias populações independentes, cada uma num
+# processo próprio, evoluindo em paralelo sem sincronizar a cada geração.
+#
+# A cada `intervalo_migracao` gerações, cada ilha manda cópias dos seus `migrantes`
+# melhores indivíduos para a próxima ilha do anel (multiprocessing.Queue) e troca os
+# seus piores pelos que recebeu da anterior. A resposta é o melhor global.
+#
+# Cada ilha é um OtimizadorGA comum rodando em épocas: run() com
+# generations=intervalo_migracao, e a população final (já com fitness, sem reavaliar)
+# volta como populacao_inicial da época seguinte. Cache de fitness, CRN, corrida e
+# codificação valem dentro de cada ilha como no GA serial.
+import contextlib
+import io
+import math
+import multiprocessing
+import os
+import queue
+import random
+import time
+import traceback
+from typing import Dict, List, Optional
+
+from otimizacao import OtimizadorGA
+
+# somados entre as ilhas no relatório final
+_SOMADOS = ('avaliacoes', 'segundos_simulados', 'segundos_economizados')
+
+# espera máxima de cada leitura do anel antes de conferir se ainda vale esperar (s)
+_ESPERA_ANEL = 0.5
+
+
+def _receber_migrantes(entrada, prazo, abortar):
+    """Migrantes da ilha anterior; [] se o prazo acabar, e None se a execução foi
+    abortada (outra ilha falhou) ou o processo principal morreu."""
+    while True:
+        espera = _ESPERA_ANEL
+        if prazo is not None:
+            espera = min(espera, max(0.0, prazo - time.monotonic()))
+        try:
+            return entrada.get(timeout=espera)
+        except queue.Empty:
+            pass
+        if abortar.is_set() or not multiprocessing.parent_process().is_alive():
+            return None
+        if prazo is not None and time.monotonic() >= prazo:
+            return []  # a ilha anterior parou pelo prazo
+
+
+def _laco_ilha(indice, params, geracoes, n_migrantes, entrada, saida, resultados, prazo,
+               abortar):
+    # as filas do anel podem ficar com migrantes não lidos no fim: não segura a saída
+    entrada.cancel_join_thread()
+    saida.cancel_join_thread()
+    try:
+        _evoluir_ilha(indice, params, geracoes, n_migrantes, entrada, saida, resultados,
+                      prazo, abortar)
+    except Exception:
+        # o principal para as outras ilhas e levanta o erro com este traceback
+        resultados.put((indice, None, None, {'erro': traceback.format_exc()}))
+
+
+def _evoluir_ilha(indice, params, geracoes, n_migrantes, entrada, saida, resultados, prazo,
+                  abortar):
+    ga = OtimizadorGA(**params)
+    intervalo = ga.generations
+    epocas = math.ceil(geracoes / intervalo)
+    relatorio = {'geracoes': 0, 'avaliacoes': 0, 'segundos_simulados': 0.0,
+                 'segundos_economizados': 0.0, 'esgotou_tempo': False, 'migracoes': 0}
+    for epoca in range(epocas):
+        if prazo is not None:
+            ga.tempo_limite = prazo - time.monotonic()
+            if ga.tempo_limite <= 0:
+                relatorio['esgotou_tempo'] = True
+                break
+        # a última época fica com o resto das gerações
+        ga.generations = min(intervalo, geracoes - epoca * intervalo)
+        # as ilhas rodam juntas: o log por geração de cada uma só atrapalharia
+        with contextlib.redirect_stdout(io.StringIO()):
+            ga.run()
+        relatorio['geracoes'] += ga.relatorio['geracoes']
+        for chave in _SOMADOS:
+            relatorio[chave] += ga.relatorio[chave]
+        populacao = ga.populacao_final
+        if ga.relatorio['esgotou_tempo']:
+            relatorio['esgotou_tempo'] = True
+            break
+        if epoca == epocas - 1 or entrada is saida:
+            break
+        saida.put(populacao[:n_migrantes])
+        chegados = _receber_migrantes(entrada, prazo, abortar)
+        if chegados is None:
+            return
+        # migrantes substituem os piores (populacao_final vem ordenada)
+        populacao = populacao[:len(populacao) - len(chegados)] + chegados
+        ga.populacao_inicial = populacao
+        relatorio['migracoes'] += 1
+    populacao = ga.populacao_final
+    melhor = ga.decodificar(populacao[0][1]) if populacao else None
+    if ga.cache is not None:
+        relatorio['cache'] = ga.cache.resumo()
+    resultados.put((indice, melhor, populacao, relatorio))
+
+
+class OtimizadorIlhas:
+    """
+    Mesma interface do OtimizadorGA (run() -> (melhor, fitness), relatorio,
+    populacao_final), com n_ilhas populações de pop_size indivíduos em processos
+    separados. `generations` é o total de gerações de cada ilha; os demais parâmetros
+    (params_ga) são repassados a cada OtimizadorGA. Com seed, cada ilha recebe uma
+    semente derivada dela e o resultado é reprodutível (sem tempo_limite). Com
+    n_workers > 1 cada ilha avalia num pool próprio (n_ilhas × n_workers processos).
+    Se uma ilha falha, run() para as outras e levanta RuntimeError.
+    """
+    def __init__(self, n_ilhas: Optional[int] = None, intervalo_migracao=5, migrantes=2,
+                 **params_ga):
+        if n_ilhas is None:
+            n_ilhas = os.cpu_count() or 1
+        self.n_ilhas = max(1, int(n_ilhas))
+        self.intervalo_migracao = max(1, int(intervalo_migracao))
+        self.migrantes = max(0, int(migrantes))
+        self.params_ga = params_ga
+        self.generations = params_ga.get('generations', 10)
+        self.tempo_limite = params_ga.pop('tempo_limite', None)
+        self.seed = params_ga.get('seed')
+        # warm start: repartido entre as ilhas (cada uma começa de uma fatia diferente)
+        self.populacao_inicial = list(params_ga.pop('populacao_inicial', None) or [])
+        self.cache = None  # cada ilha tem o seu; o resumo vai em relatorio['cache']
+        self.relatorio: Dict[str, object] = {}
+        # populações finais de todas as ilhas, juntas e ordenadas [(fit, indiv)]
+        self.populacao_final: List[tuple] = []
+
+    def _params_ilha(self, indice, sementes):
+        params = dict(self.params_ga, generations=self.intervalo_migracao,
+                      seed=sementes[indice],
+                      populacao_inicial=self.populacao_inicial[indice::self.n_ilhas])
+        return params
+
+    def run(self):
+        inicio = time.monotonic()
+        prazo = inicio + self.tempo_limite if self.tempo_limite is not None else None
+        n = self.n_ilhas
+        rng = random.Random(self.seed)
+        sementes = [rng.getrandbits(32) if self.seed is not None else None for _ in range(n)]
+        # anel: a ilha i lê de filas[i] e escreve em filas[i+1]
+        filas = [multiprocessing.Queue() for _ in range(n)]
+        resultados = multiprocessing.Queue()
+        # avisa as ilhas que ainda esperam migrantes que a execução acabou
+        abortar = multiprocessing.Event()
+        # não são daemon: com n_workers > 1 cada ilha abre o seu pool de avaliação.
+        # O finally garante que nenhuma fica para trás
+        processos = [
+            multiprocessing.Process(
+                target=_laco_ilha, name=f"sintra-ilha-{i}",
+                args=(i, self._params_ilha(i, sementes), self.generations, self.migrantes,
+                      filas[i], filas[(i + 1) % n], resultados, prazo, abortar))
+            for i in range(n)]
+        recebidos = {}
+        try:
+            for p in processos:
+                p.start()
+            while len(recebidos) < n:
+                try:
+                    indice, melhor, populacao, relatorio = resultados.get(timeout=1.0)
+                except queue.Empty:
+                    # uma ilha que saiu sem resultado trava o anel: falha já
+                    for i, p in enumerate(processos):
+                        if i not in recebidos and p.exitcode not in (None, 0):
+                            raise RuntimeError(f"ilha {i} terminou sem devolver resultado "
+                                               f"(código {p.exitcode})")
+                    if not any(p.is_alive() for p in processos) and resultados.empty():
+                        raise RuntimeError("ilha terminou sem devolver resultado")
+                    continue
+                if 'erro' in relatorio:
+                    raise RuntimeError(f"ilha {indice} falhou:\n{relatorio['erro']}")
+                recebidos[indice] = (melhor, populacao, relatorio)
+                fit = populacao[0][0] if populacao else float('nan')
+                print(f"GA ilha {indice}: {relatorio['geracoes']} gerações, "
+                      f"{relatorio['migracoes']} migrações, best fit {fit:.3f}")
+        finally:
+            if len(recebidos) < n:
+                abortar.set()
+            for p in processos:
+                if p.pid is None:
+                    continue
+                p.join(5.0)
+                if p.is_alive():
+                    p.terminate()
+                    p.join()
+        self.populacao_final = sorted((item for _, pop, _ in recebidos.values() for item in pop),
+                                      key=lambda x: x[0])
+        self._resumir(recebidos, time.monotonic() - inicio)
+        # melhor global: o decodificado pela ilha dona do melhor indivíduo
+        com_pop = [(pop[0][0], melhor) for melhor, pop, _ in recebidos.values() if pop]
+        best_fit, best = min(com_pop, key=lambda x: x[0])
+        return best, best_fit
+
+    def _resumir(self, recebidos, tempo):
+        relatorios = [recebidos[i][2] for i in sorted(recebidos)]
+        self.relatorio = {'geracoes': min(r['geracoes'] for r in relatorios),
+                          'tempo': tempo,
+                          'esgotou_tempo': any(r['esgotou_tempo'] for r in relatorios),
+                          'ilhas': self.n_ilhas,
+                          'migracoes': sum(r['migracoes'] for r in relatorios),
+                          'por_ilha': relatorios}
+        for chave in _SOMADOS:
+            self.relatorio[chave] = sum(r[chave] for r in relatorios)
+        caches = [r['cache'] for r in relatorios if 'cache' in r]
+        if caches:
+            self.relatorio['cache'] = {k: sum(c[k] for c in caches) for k in ('hits', 'misses')}
@@ -0,0 +1,239 @@
+# metricas.py
+# Métricas do servidor SINTRA em memória (contadores e histogramas), exportadas no
+# formato texto do Prometheus pelo /metrics do sintra1.py (ou por servir(), no processo
+# de controle do modo de produção).
+#
+# SINTRA_METRICAS=0 desliga tudo: ATIVO fica False, medir() devolve a própria função
+# sem embrulho, os locks não são trocados e os trechos medidos em linha ficam atrás de
+# um `if metricas.ATIVO`. Contadores e medidores por função (contador_de/medidor) não
+# custam nada no caminho quente: só são lidos quando alguém consulta /metrics.
+import functools
+import os
+import threading
+import time
+from bisect import bisect_left
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+ATIVO = os.environ.get("SINTRA_METRICAS", "1") != "0"
+
+# limites dos histogramas de tempo (s): de microssegundos (lock, ingestão) a segundos (GA)
+LIMITES_SEGUNDOS = (5e-6, 1e-5, 2.5e-5, 5e-5, 1e-4, 2.5e-4, 5e-4, 1e-3, 2.5e-3, 5e-3,
+                    0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+TIPO_CONTEUDO = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def _rotulos(rotulos: Dict[str, str], extra: str = "") -> str:
+    pares = [f'{k}="{v}"' for k, v in rotulos.items()]
+    if extra:
+        pares.append(extra)
+    return "{" + ",".join(pares) + "}" if pares else ""
+
+
+class Contador:
+    tipo = "counter"
+
+    def __init__(self, nome: str, ajuda: str, rotulos: Optional[Dict[str, str]] = None):
+        self.nome = nome
+        self.ajuda = ajuda
+        self.rotulos = rotulos or {}
+        self._valor = 0.0
+        self._lock = threading.Lock()
+
+    def inc(self, n: float = 1.0):
+        with self._lock:
+            self._valor += n
+
+    def linhas(self) -> List[str]:
+        return [f"{self.nome}{_rotulos(self.rotulos)} {self._valor:g}"]
+
+
+class Histograma:
+    tipo = "histogram"
+
+    def __init__(self, nome: str, ajuda: str, limites: Sequence[float] = LIMITES_SEGUNDOS,
+                 rotulos: Optional[Dict[str, str]] = None):
+        self.nome = nome
+        self.ajuda = ajuda
+        self.rotulos = rotulos or {}
+        self.limites = tuple(limites)
+        self._contagens = [0] * (len(self.limites) + 1)   # última: acima do maior limite
+        self._soma = 0.0
+        self._lock = threading.Lock()
+
+    def observar(self, valor: float):
+        i = bisect_left(self.limites, valor)
+        with self._lock:
+            self._contagens[i] += 1
+            self._soma += valor
+
+    def linhas(self) -> List[str]:
+        with self._lock:
+            contagens = list(self._contagens)
+            soma = self._soma
+        saida = []
+        acumulado = 0
+        for limite, n in zip(self.limites, contagens):
+            acumulado += n
+            le = 'le="%g"' % limite
+            saida.append(f"{self.nome}_bucket{_rotulos(self.rotulos, le)} {acumulado}")
+        acumulado += contagens[-1]
+        le = 'le="+Inf"'
+        saida.append(f"{self.nome}_bucket{_rotulos(self.rotulos, le)} {acumulado}")
+        saida.append(f"{self.nome}_sum{_rotulos(self.rotulos)} {soma:g}")
+        saida.append(f"{self.nome}_count{_rotulos(self.rotulos)} {acumulado}")
+        return saida
+
+
+class _PorFuncao:
+    """Contador ou medidor cujo valor é lido de uma função só na exportação."""
+    def __init__(self, tipo: str, nome: str, ajuda: str, funcao: Callable[[], float],
+                 rotulos: Optional[Dict[str, str]] = None):
+        self.tipo = tipo
+        self.nome = nome
+        self.ajuda = ajuda
+        self.funcao = funcao
+        self.rotulos = rotulos or {}
+
+    def linhas(self) -> List[str]:
+        try:
+            valor = self.funcao()
+        except Exception:
+            return []   # a fonte ainda não existe (ex.: nenhum plano pronto)
+        if valor is None:
+            return []
+        return [f"{self.nome}{_rotulos(self.rotulos)} {float(valor):g}"]
+
+
+_registradas: List = []
+_lock_registro = threading.Lock()
+
+
+def _registrar(metrica):
+    with _lock_registro:
+        _registradas.append(metrica)
+    return metrica
+
+
+def remover(*metricas):
+    """Tira métricas da exportação (ex.: as que não se aplicam a este processo)."""
+    with _lock_registro:
+        _registradas[:] = [m for m in _registradas if all(m is not r for r in metricas)]
+
+
+def contador(nome, ajuda, rotulos=None) -> Contador:
+    return _registrar(Contador(nome, ajuda, rotulos))
+
+
+def histograma(nome, ajuda, limites=LIMITES_SEGUNDOS, rotulos=None) -> Histograma:
+    return _registrar(Histograma(nome, ajuda, limites, rotulos))
+
+
+def contador_de(nome, ajuda, funcao, rotulos=None):
+    """Contador mantido em outro lugar (ex.: dicionários `metricas` já existentes)."""
+    return _registrar(_PorFuncao("counter", nome, ajuda, funcao, rotulos))
+
+
+def medidor(nome, ajuda, funcao, rotulos=None):
+    return _registrar(_PorFuncao("gauge", nome, ajuda, funcao, rotulos))
+
+
+def exportar(nomes: Optional[Sequence[str]] = None) -> str:
+    """As métricas registradas (só as de `nomes`, se dado) no formato texto do Prometheus."""
+    with _lock_registro:
+        metricas = [m for m in _registradas if nomes is None or m.nome in nomes]
+    grupos: Dict[str, Tuple[str, str, List[str]]] = {}
+    for m in metricas:
+        if m.nome not in grupos:
+            grupos[m.nome] = (m.tipo, m.ajuda, [])
+        grupos[m.nome][2].extend(m.linhas())
+    saida = []
+    for nome, (tipo, ajuda, linhas) in grupos.items():
+        saida.append(f"# HELP {nome} {ajuda}")
+        saida.append(f"# TYPE {nome} {tipo}")
+        saida.extend(linhas)
+    return "\n".join(saida) + "\n"
+
+
+# ---------- instrumentação ----------
+def medir(hist: Histograma):
+    """Decorador: observa a duração de cada chamada. Desligado, não embrulha nada."""
+    def decorador(funcao):
+        if not ATIVO:
+            return funcao
+
+        @functools.wraps(funcao)
+        def medida(*args, **kwargs):
+            t0 = time.perf_counter()
+            try:
+                return funcao(*args, **kwargs)
+            finally:
+                hist.observar(time.perf_counter() - t0)
+        return medida
+    return decorador
+
+
+class LockMedido:
+    """Lock que observa a espera para adquirir e o tempo de posse.
+
+    Substitui um threading.Lock em uso com `with` (ou acquire/release). Só deve ser
+    instalado com ATIVO.
+    """
+    def __init__(self, espera: Histograma, posse: Histograma, lock=None):
+        self._lock = lock if lock is not None else threading.Lock()
+        self._espera = espera
+        self._posse = posse
+        self._desde = 0.0   # só quem tem o lock escreve
+
+    def acquire(self, blocking=True, timeout=-1):
+        t0 = time.perf_counter()
+        ok = self._lock.acquire(blocking, timeout)
+        if ok:
+            self._desde = time.perf_counter()
+            self._espera.observar(self._desde - t0)
+        return ok
+
+    def release(self):
+        self._posse.observar(time.perf_counter() - self._desde)
+        self._lock.release()
+
+    def locked(self):
+        return self._lock.locked()
+
+    def __enter__(self):
+        self.acquire()
+        return self
+
+    def __exit__(self, *exc):
+        self.release()
+
+
+# ---------- servidor próprio (processo sem Flask) ----------
+class _TratadorMetricas(BaseHTTPRequestHandler):
+    nomes: Optional[Sequence[str]] = None
+
+    def do_GET(self):
+        if self.path.split("?")[0] != "/metrics":
+            self.send_error(404)
+            return
+        corpo = exportar(self.nomes).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", TIPO_CONTEUDO)
+        self.send_header("Content-Length", str(len(corpo)))
+        self.end_headers()
+        self.wfile.write(corpo)
+
+    def log_message(self, *args):
+        pass
+
+
+def servir(host: str, porta: int, nomes: Optional[Sequence[str]] = None) -> ThreadingHTTPServer:
+    """Expõe /metrics deste processo numa thread própria; `nomes` restringe às métricas
+    que fazem sentido nele (ex.: processo de estado do modo de produção)."""
+    tratador = type("TratadorMetricas", (_TratadorMetricas,),
+                    {"nomes": frozenset(nomes) if nomes is not None else None})
+    servidor = ThreadingHTTPServer((host, porta), tratador)
+    threading.Thread(target=servidor.serve_forever, name="sintra-metricas", daemon=True).start()
+    print(f"[METRICAS] /metrics em {host}:{porta}")
+    return servidor
@@ -0,0 +1,137 @@
+# operadores_vetorizados.py
+# Operadores genéticos do OtimizadorGA sobre a população inteira em NumPy
+# (OtimizadorGA(populacao='matriz')).
+#
+# A população é uma matriz indivíduos x genes mais um vetor de fitness. Torneio,
+# cruzamento uniforme (ou convexo, na codificação por fases) e mutação são aplicados à
+# geração toda de uma vez, sem laço Python por gene; elitismo usa argpartition em vez de
+# ordenar tudo. A avaliação continua indivíduo a indivíduo (cache, CRN, corrida e pool
+# do OtimizadorGA), então só a conversão linha -> indivíduo é por filho.
+from array import array
+from typing import List, Tuple
+
+import numpy as np
+
+
+class OperadoresMatriz:
+    def __init__(self, ga, seed: int):
+        self.ga = ga
+        self.rng = np.random.default_rng(seed)
+        fases = ga._fases
+        self.fases = fases
+        if fases is None:
+            # colunas: verdes (na ordem de rede_vias) e depois os offsets
+            self.genes = list(ga._genes)
+            n_vias = len(ga.rede_vias)
+            self.n_vias = n_vias
+            coluna = {vid: j for j, vid in enumerate(ga.rede_vias)}
+            grupos = list(ga.intersecoes.values())
+            # indicadora via x interseção, para somar os verdes de cada grupo com um matmul
+            self.indicadora = np.zeros((n_vias, len(grupos)))
+            self.agrupadas = np.zeros(n_vias, dtype=bool)
+            self.grupo_da_via = np.zeros(n_vias, dtype=np.int64)
+            for g, vias in enumerate(grupos):
+                for vid in vias:
+                    self.indicadora[coluna[vid], g] = 1.0
+                    self.agrupadas[coluna[vid]] = True
+                    self.grupo_da_via[coluna[vid]] = g
+        else:
+            # bloco de cada coluna, para sortear um lambda por (filho, interseção)
+            self.bloco_da_coluna = np.zeros(fases.tamanho, dtype=np.int64)
+            for k, (_, inicio, vias, _) in enumerate(fases.blocos):
+                fim = inicio + 1 + len(vias) + (1 if fases.offsets else 0)
+                self.bloco_da_coluna[inicio:fim] = k
+
+    # ---------- conversão ----------
+    def matriz(self, populacao: List[tuple]) -> Tuple[np.ndarray, np.ndarray]:
+        """[(fit, indiv)] -> (P, f)."""
+        if self.fases is not None:
+            P = np.array([np.frombuffer(ind, dtype=np.float64) for _, ind in populacao])
+        else:
+            P = np.array([[ind[g] for g in self.genes] for _, ind in populacao])
+        f = np.array([fit for fit, _ in populacao], dtype=np.float64)
+        return P, f
+
+    def populacao(self, P: np.ndarray, f: np.ndarray) -> List[tuple]:
+        return [(float(fit), self.indiv(linha)) for fit, linha in zip(f, P)]
+
+    def proxima(self, P: np.ndarray, f: np.ndarray, elite: np.ndarray,
+                avaliados: List[tuple]) -> Tuple[np.ndarray, np.ndarray]:
+        """Elite da geração atual + filhos avaliados ([(fit, indiv)])."""
+        if not avaliados:
+            return P[elite], f[elite]
+        P_filhos, f_filhos = self.matriz(avaliados)
+        return np.vstack((P[elite], P_filhos)), np.concatenate((f[elite], f_filhos))
+
+    def indiv(self, linha: np.ndarray):
+        if self.fases is not None:
+            return array('d', linha.tobytes())
+        return dict(zip(self.genes, linha.tolist()))
+
+    # ---------- operadores ----------
+    @staticmethod
+    def elite(f: np.ndarray, k: int) -> np.ndarray:
+        if k >= f.size:
+            return np.argsort(f)
+        idx = np.argpartition(f, k)[:k]
+        return idx[np.argsort(f[idx])]
+
+    def torneio(self, f: np.ndarray, m: int) -> np.ndarray:
+        # torneio binário (como tournament_select), m vencedores
+        a = self.rng.integers(0, f.size, m)
+        b = self.rng.integers(0, f.size, m)
+        return np.where(f[a] < f[b], a, b)
+
+    def filhos(self, P: np.ndarray, f: np.ndarray, m: int) -> np.ndarray:
+        pais1 = P[self.torneio(f, m)]
+        pais2 = P[self.torneio(f, m)]
+        if self.fases is not None:
+            lam = self.rng.random((m, len(self.fases.blocos)))[:, self.bloco_da_coluna]
+            C = lam * pais1 + (1.0 - lam) * pais2
+            self._mutar_fases(C)
+        else:
+            C = np.where(self.rng.random(pais1.shape) < 0.5, pais1, pais2)
+            self._mutar_verdes(C)
+            self._ajustar_ciclo(C)
+        return C
+
+    def _ajustar_ciclo(self, C: np.ndarray):
+        # soma dos verdes por interseção <= cycle_limit (mesma regra de _ajustar_ciclo)
+        verdes = C[:, :self.n_vias]
+        somas = verdes @ self.indicadora
+        fator = np.minimum(1.0, self.ga.cycle_limit / np.maximum(somas, 1e-12))
+        fator_via = np.where(self.agrupadas, fator[:, self.grupo_da_via], 1.0)
+        verdes *= fator_via
+
+    def _mutar_verdes(self, C: np.ndarray):
+        linhas = np.flatnonzero(self.rng.random(C.shape[0]) < self.ga.mutation_rate)
+        if linhas.size == 0:
+            return
+        colunas = self.rng.integers(0, C.shape[1], linhas.size)
+        e_offset = colunas >= self.n_vias
+        C[linhas, colunas] = np.where(e_offset,
+                                      self.rng.uniform(0, self.ga.cycle_limit, linhas.size),
+                                      self.rng.uniform(5, 30, linhas.size))
+
+    def _mutar_fases(self, C: np.ndarray):
+        fases = self.fases
+        linhas = np.flatnonzero(self.rng.random(C.shape[0]) < self.ga.mutation_rate)
+        if linhas.size == 0:
+            return
+        blocos = self.rng.integers(0, len(fases.blocos), linhas.size)
+        alvos = self.rng.integers(0, 3 if fases.offsets else 2, linhas.size)
+        for k, (_, inicio, vias, ciclo_min) in enumerate(fases.blocos):
+            no_bloco = blocos == k
+            ciclo = linhas[no_bloco & (alvos == 0)]
+            if ciclo.size:
+                C[ciclo, inicio] = 0.5 * C[ciclo, inicio] + 0.5 * self.rng.uniform(
+                    ciclo_min, fases.ciclo_max, ciclo.size)
+            divisao = linhas[no_bloco & (alvos == 1)]
+            if divisao.size:
+                cols = slice(inicio + 1, inicio + 1 + len(vias))
+                C[divisao, cols] = 0.5 * C[divisao, cols] + 0.5 * self.rng.dirichlet(
+                    np.ones(len(vias)), divisao.size)
+            offset = linhas[no_bloco & (alvos == 2)]
+            if offset.size:
+                j = inicio + 1 + len(vias)
+                C[offset, j] = (C[offset, j] + self.rng.normal(0.0, 0.1, offset.size)) % 1.0
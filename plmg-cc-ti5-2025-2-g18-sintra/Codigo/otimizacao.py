@@ -1,14 +1,218 @@
 # otimizacao.py
 # Algoritmo genético simplificado para otimizar tempos verdes por grupo (por via)
+import math
 import random
 import copy
-from typing import Dict, List
-from simulacao import Semaforo, Via, Simulador
+import statistics
+import multiprocessing
+from multiprocessing import resource_tracker
+import time
+from array import array
+from collections import OrderedDict
+from typing import Dict, List, Optional
+from simulacao import Semaforo, Via, Simulador, FluxosChegada
+from atraso_analitico import fitness_analitico, pares_concordantes
+
+# genes de offset no indivíduo: "offset:<via>" -> atraso da primeira abertura (s),
+# ao lado dos genes de verde (chave = id da via)
+PREFIXO_OFFSET = "offset:"
+# na codificação por fases, o melhor indivíduo decodificado traz "ciclo:<interseção>"
+PREFIXO_CICLO = "ciclo:"
+
+# avaliação em corrida (corrida=True): blocos mínimos antes de decidir e z do intervalo
+# de confiança (95%) das médias por bloco
+CORRIDA_MIN_BLOCOS = 3
+CORRIDA_Z = 1.96
+
+# ---------- Avaliação paralela ----------
+# Cada processo do pool recebe uma cópia do otimizador uma única vez (initializer);
+# as tarefas carregam só o indivíduo, a semente e, no modo CRN, o descritor dos
+# fluxos de chegada compartilhados, mantendo a comunicação pequena.
+_ga_worker = None
+
+def _iniciar_worker(ga):
+    global _ga_worker
+    _ga_worker = ga
+
+def _avaliar_no_worker(tarefa):
+    indiv, semente, fluxos, limiar = tarefa
+    if fluxos is None:
+        return _ga_worker._avaliar(indiv, semente, None, limiar)
+    # anexar é só um mmap; fechar logo após a avaliação evita segurar blocos antigos
+    fluxos = FluxosChegada.anexar(fluxos)
+    try:
+        return _ga_worker._avaliar(indiv, semente, fluxos, limiar)
+    finally:
+        fluxos.fechar()
+
+# ---------- Cache de fitness ----------
+class CacheFitness:
+    """Cache LRU de fitness indexado pelo indivíduo quantizado.
+
+    Os tempos verdes são arredondados para `resolucao` segundos (o controlador real
+    trabalha com segundos inteiros), de modo que filhos praticamente idênticos a
+    indivíduos já avaliados reaproveitam o resultado em vez de rodar outra simulação.
+    """
+    def __init__(self, max_itens=1024, resolucao=1.0):
+        self.max_itens = max_itens
+        self.resolucao = resolucao
+        self.itens: OrderedDict = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def chave(self, indiv, ordem):
+        return tuple(round(indiv[k] / self.resolucao) for k in ordem)
+
+    def chave_planos(self, planos):
+        # codificação por fases: quantiza o plano decodificado (s), não as frações
+        return tuple(round(x / self.resolucao) for plano in planos.values() for x in plano)
+
+    def obter(self, chave):
+        fit = self.itens.get(chave)
+        if fit is None:
+            self.misses += 1
+            return None
+        self.itens.move_to_end(chave)
+        self.hits += 1
+        return fit
+
+    def registrar_acerto(self):
+        # repetição dentro do mesmo lote: será avaliada uma vez só
+        self.hits += 1
+
+    def guardar(self, chave, fit):
+        self.itens[chave] = fit
+        self.itens.move_to_end(chave)
+        while len(self.itens) > self.max_itens:
+            self.itens.popitem(last=False)
+
+    def resumo(self):
+        return {'hits': self.hits, 'misses': self.misses, 'tamanho': len(self.itens)}
+
+# ---------- Codificação por divisão de fases ----------
+class CodificacaoFases:
+    """Genoma compacto (array('d')) com um bloco por interseção:
+    [ciclo, fração de cada fase..., fração de offset (se houver)].
+
+    As frações ficam no simplex e o ciclo em [ciclo_min, ciclo_max], com
+    ciclo_min = n * (verde_min + amarelo + vermelho_total). Decodificando, cada fase i
+    recebe verde_min + fração_i * (ciclo - ciclo_min) de verde útil, mais o amarelo
+    (incluído no verde do Semaforo, como no artigo), seguido do vermelho geral; as fases
+    se sucedem dentro do mesmo ciclo. Os operadores usam combinações convexas, então
+    todo filho já é um plano viável e não há passo de reparo.
+    """
+    def __init__(self, intersecoes: Dict[str, List[str]], ciclo_max: float,
+                 verde_min: float, amarelo: float, vermelho_total: float, offsets: bool):
+        self.ciclo_max = ciclo_max
+        self.verde_min = verde_min
+        self.amarelo = amarelo
+        self.vermelho_total = vermelho_total
+        self.offsets = offsets
+        # (nome, início do bloco, vias, ciclo mínimo)
+        self.blocos = []
+        inicio = 0
+        for nome, vias in intersecoes.items():
+            ciclo_min = len(vias) * (verde_min + amarelo + vermelho_total)
+            if ciclo_min > ciclo_max:
+                raise ValueError(f"interseção {nome}: ciclo mínimo {ciclo_min:.0f}s "
+                                 f"acima do limite {ciclo_max:.0f}s")
+            self.blocos.append((nome, inicio, list(vias), ciclo_min))
+            inicio += 1 + len(vias) + (1 if offsets else 0)
+        self.tamanho = inicio
+
+    def aleatorio(self, rng) -> array:
+        g = array('d')
+        for _, _, vias, ciclo_min in self.blocos:
+            g.append(rng.uniform(ciclo_min, self.ciclo_max))
+            g.extend(self._simplex(rng, len(vias)))
+            if self.offsets:
+                g.append(rng.random())
+        return g
+
+    @staticmethod
+    def _simplex(rng, n):
+        # ponto uniforme no simplex (Dirichlet(1, ..., 1))
+        e = [rng.expovariate(1.0) for _ in range(n)]
+        total = sum(e)
+        return [x / total for x in e]
+
+    def cruzar(self, p1: array, p2: array, rng) -> array:
+        # combinação convexa por bloco: ciclo, frações e offset continuam nos limites
+        filho = array('d', p1)
+        for _, inicio, vias, _ in self.blocos:
+            lam = rng.random()
+            fim = inicio + 1 + len(vias) + (1 if self.offsets else 0)
+            for j in range(inicio, fim):
+                filho[j] = lam * p1[j] + (1.0 - lam) * p2[j]
+        return filho
+
+    def mutar(self, indiv: array, rng):
+        _, inicio, vias, ciclo_min = rng.choice(self.blocos)
+        alvo = rng.randrange(3 if self.offsets else 2)
+        if alvo == 0:
+            # metade do caminho até um ciclo sorteado
+            indiv[inicio] = 0.5 * indiv[inicio] + 0.5 * rng.uniform(ciclo_min, self.ciclo_max)
+        elif alvo == 1:
+            novo = self._simplex(rng, len(vias))
+            for j, x in enumerate(novo, start=inicio + 1):
+                indiv[j] = 0.5 * indiv[j] + 0.5 * x
+        else:
+            j = inicio + 1 + len(vias)
+            indiv[j] = (indiv[j] + rng.gauss(0.0, 0.1)) % 1.0
+
+    def planos(self, indiv: array) -> Dict[str, tuple]:
+        """Decodifica em {via: (verde, vermelho, offset)} para os Semaforos."""
+        planos = {}
+        for _, inicio, vias, ciclo_min in self.blocos:
+            n = len(vias)
+            ciclo = indiv[inicio]
+            fracoes = indiv[inicio + 1:inicio + 1 + n]
+            total = sum(fracoes)  # 1 a menos de arredondamento
+            livre = ciclo - ciclo_min
+            t = indiv[inicio + 1 + n] * ciclo if self.offsets else 0.0
+            for via, f in zip(vias, fracoes):
+                verde = self.verde_min + f / total * livre + self.amarelo
+                planos[via] = (verde, ciclo - verde, t)
+                t += verde + self.vermelho_total
+        return planos
+
+    def decodificar(self, indiv: array) -> Dict[str, float]:
+        """Plano legível: verde por via, offsets e o ciclo de cada interseção."""
+        planos = self.planos(indiv)
+        res = {via: p[0] for via, p in planos.items()}
+        res.update({PREFIXO_OFFSET + via: p[2] for via, p in planos.items()})
+        res.update({PREFIXO_CICLO + nome: indiv[inicio] for nome, inicio, _, _ in self.blocos})
+        return res
+
+
+def _validar_particao(intersecoes: Dict[str, List[str]], rede_vias: Dict[str, Via]):
+    """Cada via da rede deve estar em exatamente uma interseção (e só vias da rede): uma
+    via de fora sumiria dos planos (e do fitness) na codificação por fases, e uma via
+    desconhecida só falharia depois, com KeyError, nos genes e offsets."""
+    vistas: Dict[str, str] = {}
+    for nome, vias in intersecoes.items():
+        for vid in vias:
+            if vid not in rede_vias:
+                raise ValueError(f"interseção {nome}: via desconhecida {vid}")
+            if vid in vistas:
+                raise ValueError(f"via {vid} aparece nas interseções {vistas[vid]} e {nome}")
+            vistas[vid] = nome
+    faltando = [vid for vid in rede_vias if vid not in vistas]
+    if faltando:
+        raise ValueError(f"vias fora de qualquer interseção: {', '.join(faltando)}")
+
 
 class OtimizadorGA:
     def __init__(self, rede_vias: Dict[str, Via], desloc, movimentos,
                  pop_size=100, generations=10, mutation_rate=0.05, cycle_limit=120,
-                 sim_time=24*3600):
+                 sim_time=24*3600, n_workers=1, seed: Optional[int] = None,
+                 cache_size=0, cache_resolucao=1.0, motor='eventos',
+                 tempo_limite: Optional[float] = None, populacao_inicial=None,
+                 intersecoes: Optional[Dict[str, List[str]]] = None,
+                 otimizar_offsets: Optional[bool] = None, replicacoes=1, crn=False,
+                 corrida=False, corrida_blocos=12, corrida_tolerancia=0.02,
+                 codificacao='verdes', verde_min=5.0, amarelo=3.0, vermelho_total=1.0,
+                 populacao='lista', triagem: Optional[float] = None):
         self.rede_vias = rede_vias
         self.desloc = desloc
         self.movimentos = movimentos
@@ -17,86 +221,518 @@ class OtimizadorGA:
         self.mutation_rate = mutation_rate
         self.cycle_limit = cycle_limit
         self.sim_time = sim_time
+        # n_workers > 1 avalia cada geração inteira em um pool de processos
+        self.n_workers = max(1, int(n_workers or 1))
+        # seed torna a execução reprodutível: operadores genéticos usam self.rng e cada
+        # avaliação recebe sua própria semente, independente do worker que a executa.
+        # Sem seed usa o módulo random global, como o Simulador: random.seed(x) antes do
+        # run() continua tornando a execução reprodutível
+        self.seed = seed
+        self.rng = random.Random(seed) if seed is not None else random
+        # fitness = média de `replicacoes` simulações independentes
+        self.replicacoes = max(1, int(replicacoes))
+        # crn: todos os indivíduos de um lote (geração) são simulados sobre as mesmas
+        # chegadas, sorteadas uma vez e compartilhadas com os workers sem cópia
+        self.crn = crn
+        # cache de fitness (opcional, cache_size=0 desliga): com fitness ruidoso muda a
+        # trajetória do GA, então só é ligado onde se quer (ex.: parametros_ga)
+        self.cache = CacheFitness(cache_size, cache_resolucao) if cache_size else None
+        # motor de simulação usado no fitness: 'eventos' (Simulador) ou 'vetorizado'
+        # (SimuladorVetorizado, mesmas regras de partida, apenas interseções isoladas)
+        if motor not in ('eventos', 'vetorizado'):
+            raise ValueError(f"motor desconhecido: {motor}")
+        if motor == 'vetorizado' and movimentos:
+            raise ValueError("o motor vetorizado não simula movimentos entre vias")
+        self.motor = motor
+        # corrida: simula em corrida_blocos blocos e para cedo quando o candidato já é
+        # claramente pior que o incumbente (melhor fitness até a geração anterior) ou
+        # quando o IC da estimativa fica abaixo de corrida_tolerancia (relativo)
+        if corrida and motor != 'eventos':
+            raise ValueError("a avaliação em corrida precisa do motor 'eventos'")
+        self.corrida = corrida
+        self.corrida_blocos = max(CORRIDA_MIN_BLOCOS, int(corrida_blocos))
+        self.corrida_tolerancia = corrida_tolerancia
+        self._incumbente: Optional[float] = None
+        self.segundos_simulados = 0.0
+        self.segundos_economizados = 0.0
+        self.interrompidas = {'pior': 0, 'convergiu': 0}
+        # grupos de vias que dividem o ciclo (soma dos verdes <= cycle_limit em cada um);
+        # sem informação, a rede inteira é tratada como uma interseção isolada
+        self.intersecoes = intersecoes or {'rede': list(rede_vias.keys())}
+        _validar_particao(self.intersecoes, rede_vias)
+        # offsets só fazem diferença quando há veículos passando de uma via para outra
+        if otimizar_offsets is None:
+            otimizar_offsets = bool(movimentos)
+        self._offsets = [PREFIXO_OFFSET + vid for vid in rede_vias] if otimizar_offsets else []
+        self._genes = list(rede_vias.keys()) + self._offsets
+        # codificação: 'verdes' (dict via -> verde, ciclo fixo em cycle_limit, reparo pela
+        # soma) ou 'fases' (CodificacaoFases: ciclo + divisão de fases, sempre viável)
+        if codificacao not in ('verdes', 'fases'):
+            raise ValueError(f"codificação desconhecida: {codificacao}")
+        self.codificacao = codificacao
+        # populacao: 'lista' ([(fit, indiv)], operadores por indivíduo) ou 'matriz'
+        # (operadores_vetorizados.py: NumPy, geração inteira de uma vez)
+        if populacao not in ('lista', 'matriz'):
+            raise ValueError(f"representação de população desconhecida: {populacao}")
+        self.populacao = populacao
+        # triagem: fração dos candidatos de cada geração que é simulada. A geração sorteia
+        # (pop_size - elite) / triagem candidatos, ordena todos pela estimativa analítica
+        # (atraso_analitico.py) e só os melhores seguem para o Simulador; o número de
+        # simulações por geração não muda, a seleção é que fica mais exigente
+        if triagem is not None:
+            if not 0 < triagem <= 1:
+                raise ValueError(f"triagem deve estar em (0, 1]: {triagem}")
+            if movimentos:
+                raise ValueError("a triagem analítica só vale para aproximações isoladas "
+                                 "(sem movimentos)")
+        self.triagem = triagem
+        self.estatisticas_triagem = {'candidatos': 0, 'simulados': 0, 'pares': 0,
+                                     'concordantes': 0}
+        self._fases = (CodificacaoFases(self.intersecoes, cycle_limit, verde_min, amarelo,
+                                        vermelho_total, otimizar_offsets)
+                       if codificacao == 'fases' else None)
+        # simulações efetivamente executadas (acertos no cache não contam)
+        self.num_avaliacoes = 0
+        # tempo_limite (s de relógio): run() devolve o melhor encontrado até o prazo
+        self.tempo_limite = tempo_limite
+        self._prazo: Optional[float] = None
+        self.relatorio: Dict[str, object] = {}
+        # warm start: indivíduos (dict) ou pares (fit, dict) de uma execução anterior;
+        # pares com fitness não são reavaliados
+        self.populacao_inicial = list(populacao_inicial or [])
+        # população final ordenada [(fit, indiv)], para alimentar a próxima execução
+        self.populacao_final: List[tuple] = []
+
+    def __getstate__(self):
+        # o módulo random (sem seed) não é serializável: os workers não usam self.rng
+        estado = self.__dict__.copy()
+        if estado['rng'] is random:
+            estado['rng'] = None
+        return estado
+
+    def __setstate__(self, estado):
+        self.__dict__.update(estado)
+        if self.rng is None:
+            self.rng = random
 
     def random_individual(self):
+        if self._fases is not None:
+            return self._fases.aleatorio(self.rng)
         # individual: dict via_id -> verde_time (float >0), ensure sum per intersection < cycle_limit
-        indiv = {vid: random.uniform(5, 30) for vid in self.rede_vias.keys()}
-        # simple normalize per-sum if necessary (for isolated intersections this is ok)
-        s = sum(indiv.values())
-        if s > self.cycle_limit:
-            factor = self.cycle_limit / s
-            for k in indiv:
-                indiv[k] *= factor
+        indiv = {vid: self.rng.uniform(5, 30) for vid in self.rede_vias.keys()}
+        for g in self._offsets:
+            indiv[g] = self.rng.uniform(0, self.cycle_limit)
+        self._ajustar_ciclo(indiv)
+        return indiv
+
+    def _ajustar_ciclo(self, indiv):
+        # simple normalize per-sum if necessary; offsets não entram na soma
+        for vias in self.intersecoes.values():
+            s = sum(indiv[vid] for vid in vias)
+            if s > self.cycle_limit:
+                factor = self.cycle_limit / s
+                for k in vias:
+                    indiv[k] *= factor
+
+    def _copiar(self, indiv):
+        # cópia de um indivíduo vindo de fora (warm start)
+        if self._fases is not None:
+            if len(indiv) != self._fases.tamanho:
+                raise ValueError("indivíduo incompatível com a codificação por fases")
+            return array('d', indiv)
+        return self._completar(dict(indiv))
+
+    def _completar(self, indiv):
+        # indivíduos de execuções sem offsets (warm start) ficam com offset 0
+        for g in self._offsets:
+            indiv.setdefault(g, 0.0)
         return indiv
 
-    def fitness(self, indiv):
+    def _classe_simulador(self):
+        if self.motor == 'vetorizado':
+            # import tardio: NumPy só é necessário quando o motor vetorizado é escolhido
+            from simulacao_vetorizada import SimuladorVetorizado
+            return SimuladorVetorizado
+        return Simulador
+
+    def fitness(self, indiv, rng=None, chegadas=None):
+        fit, avg_waits, _, _ = self._simular(indiv, rng, chegadas)
+        return fit, avg_waits
+
+    def _simular(self, indiv, rng=None, chegadas=None, limiar=None):
+        """Retorna (fit, avg_waits, segundos simulados, motivo da parada antecipada)."""
         # build semaphores with given verdes and simulate
         vias = {}
-        for vid, via in self.rede_vias.items():
-            verde = indiv[vid]
-            vermelho = max(1.0, self.cycle_limit - verde)  # simple approach
-            sem = Semaforo(id=vid, verde=verde, vermelho=vermelho, offset=0.0)
-            vias[vid] = Via(id=vid, semaforo=sem, mu_chegada=via.mu_chegada)
-        sim = Simulador(vias=vias, movimentos=self.movimentos, deslocamentos=self.desloc,
-                        T_reage=4.1, T_passa=3.4, sim_time=self.sim_time)
-        res = sim.run()
+        for vid, (verde, vermelho, offset) in self._planos(indiv).items():
+            sem = Semaforo(id=vid, verde=verde, vermelho=vermelho, offset=offset)
+            vias[vid] = Via(id=vid, semaforo=sem, mu_chegada=self.rede_vias[vid].mu_chegada)
+        sim = self._classe_simulador()(vias=vias, movimentos=self.movimentos,
+                                       deslocamentos=self.desloc, T_reage=4.1, T_passa=3.4,
+                                       sim_time=self.sim_time, rng=rng, chegadas=chegadas)
+        if self.corrida:
+            motivo = self._correr(sim, limiar)
+            res = sim.resultado()
+            simulado = sim.tempo
+        else:
+            res = sim.run()
+            motivo = None
+            simulado = self.sim_time
         # objective: minimize maximum average wait among vias (as article)
         avg_waits = res['avg_waits']
         max_wait = max(avg_waits.values()) if avg_waits else float('inf')
         # lower is better, return negative for maximization if needed; here we return directly
-        return max_wait, avg_waits
+        return max_wait, avg_waits, simulado, motivo
+
+    def _planos(self, indiv):
+        """{via: (verde, vermelho, offset)} representado pelo indivíduo."""
+        if self._fases is not None:
+            return self._fases.planos(indiv)
+        planos = {}
+        for vid in self.rede_vias:
+            verde = indiv[vid]
+            vermelho = max(1.0, self.cycle_limit - verde)  # simple approach
+            planos[vid] = (verde, vermelho, indiv.get(PREFIXO_OFFSET + vid, 0.0))
+        return planos
+
+    def decodificar(self, indiv):
+        """Indivíduo em forma de dict legível (o próprio dict na codificação 'verdes')."""
+        if self._fases is not None:
+            return self._fases.decodificar(indiv)
+        return indiv
+
+    def _correr(self, sim, limiar):
+        """Simula em blocos e decide a cada bloco se vale continuar.
+
+        O IC vem das médias por bloco (batch means) do objetivo, a maior espera média
+        entre as vias. Retorna 'pior', 'convergiu' ou None (horizonte completo).
+        """
+        blocos = self.corrida_blocos
+        duracao = self.sim_time / blocos
+        waits = list(sim.waits.values())
+        n_ant = [0] * len(waits)
+        soma_ant = [0.0] * len(waits)
+        medias_bloco = []
+        for k in range(1, blocos + 1):
+            sim.run_ate(self.sim_time if k == blocos else k * duracao)
+            valor = 0.0
+            for j, w in enumerate(waits):
+                soma = w.media * w.n
+                if w.n > n_ant[j]:
+                    valor = max(valor, (soma - soma_ant[j]) / (w.n - n_ant[j]))
+                n_ant[j], soma_ant[j] = w.n, soma
+            medias_bloco.append(valor)
+            if k < CORRIDA_MIN_BLOCOS or k == blocos:
+                continue
+            estimativa = max(w.media for w in waits)
+            meia = CORRIDA_Z * statistics.stdev(medias_bloco) / math.sqrt(k)
+            if limiar is not None and estimativa - meia > limiar:
+                return 'pior'
+            if meia <= self.corrida_tolerancia * estimativa:
+                return 'convergiu'
+        return None
 
     def tournament_select(self, population, k=2):
-        a = random.choice(population)
-        b = random.choice(population)
+        a = self.rng.choice(population)
+        b = self.rng.choice(population)
         return a if a[0] < b[0] else b  # choose with smaller fitness (lower wait)
 
     def crossover(self, parent1, parent2):
+        if self._fases is not None:
+            return self._fases.cruzar(parent1, parent2, self.rng)
         child = {}
-        for vid in parent1.keys():
-            child[vid] = parent1[vid] if random.random() < 0.5 else parent2[vid]
+        for g in self._genes:
+            child[g] = parent1[g] if self.rng.random() < 0.5 else parent2[g]
         # fix sum if needed
-        s = sum(child.values())
-        if s > self.cycle_limit:
-            factor = self.cycle_limit / s
-            for k in child:
-                child[k] *= factor
+        self._ajustar_ciclo(child)
         return child
 
     def mutate(self, indiv):
-        if random.random() < self.mutation_rate:
-            vid = random.choice(list(indiv.keys()))
-            indiv[vid] = random.uniform(5, 30)
-            # ensure sum constraint
-            s = sum(indiv.values())
-            if s > self.cycle_limit:
-                factor = self.cycle_limit / s
-                for k in indiv:
-                    indiv[k] *= factor
+        if self.rng.random() < self.mutation_rate:
+            if self._fases is not None:
+                self._fases.mutar(indiv, self.rng)
+                return
+            g = self.rng.choice(self._genes)
+            if g.startswith(PREFIXO_OFFSET):
+                indiv[g] = self.rng.uniform(0, self.cycle_limit)
+            else:
+                indiv[g] = self.rng.uniform(5, 30)
+                # ensure sum constraint
+                self._ajustar_ciclo(indiv)
+
+    def _avaliar(self, indiv, semente=None, fluxos=None, limiar=None):
+        # fitness médio sobre as sementes (int, tupla de ints ou None); cada simulação
+        # usa random.Random(semente) próprio, então o resultado é igual no modo serial e
+        # no paralelo; com fluxos (FluxosChegada) as chegadas vêm do fluxo comum daquela
+        # semente. Retorna (fit, segundos simulados, motivo); em corrida, uma replicação
+        # já claramente pior que o limiar dispensa as seguintes
+        sementes = semente if isinstance(semente, tuple) else (semente,)
+        total = simulado = 0.0
+        motivo = None
+        feitas = 0
+        for sem in sementes:
+            rng = random.Random(sem) if sem is not None else None
+            chegadas = fluxos.chegadas(sem) if fluxos is not None else None
+            fit, _, seg, motivo = self._simular(indiv, rng, chegadas, limiar)
+            total += fit
+            simulado += seg
+            feitas += 1
+            if motivo == 'pior':
+                break
+        return total / feitas, simulado, motivo
+
+    def _sementes(self, n):
+        # sem seed e em modo serial mantém o comportamento original (sem reseed);
+        # em paralelo a semente é obrigatória, senão os workers (fork) repetiriam
+        # a mesma sequência aleatória
+        k = self.replicacoes
+        if self.crn:
+            comuns = tuple(self.rng.getrandbits(32) for _ in range(k))
+            return [comuns] * n
+        if k == 1:
+            if self.seed is None and self.n_workers == 1:
+                return [None] * n
+            return [self.rng.getrandbits(32) for _ in range(n)]
+        return [tuple(self.rng.getrandbits(32) for _ in range(k)) for _ in range(n)]
+
+    def avaliar_lote(self, indivs, pool=None):
+        """Avalia uma lista de indivíduos, retornando [(fit, indiv), ...] na mesma ordem."""
+        # as sementes são sorteadas para o lote inteiro, haja acerto no cache ou não,
+        # para que a sequência aleatória não dependa do estado do cache
+        sementes = self._sementes(len(indivs))
+        fits = [None] * len(indivs)
+        pendentes = list(range(len(indivs)))
+        if self.cache is not None:
+            if self._fases is not None:
+                chaves = [self.cache.chave_planos(self._fases.planos(ind)) for ind in indivs]
+            else:
+                chaves = [self.cache.chave(ind, self._genes) for ind in indivs]
+            repetidos = {}  # chave -> índices do lote que esperam a mesma avaliação
+            pendentes = []
+            for i, ch in enumerate(chaves):
+                if ch in repetidos:
+                    self.cache.registrar_acerto()
+                    repetidos[ch].append(i)
+                    continue
+                fit = self.cache.obter(ch)
+                if fit is not None:
+                    fits[i] = fit
+                else:
+                    repetidos[ch] = [i]
+                    pendentes.append(i)
+        fluxos = None
+        if self.crn and pendentes:
+            # um único conjunto de chegadas para o lote inteiro
+            fluxos = FluxosChegada.gerar(self.rede_vias, self.sim_time, sementes[0],
+                                         compartilhar=pool is not None)
+        ref = fluxos.descritor() if fluxos is not None and pool is not None else fluxos
+        limiar = self._incumbente if self.corrida else None
+        tarefas = [(indivs[i], sementes[i], ref, limiar) for i in pendentes]
+        try:
+            novos = self._executar(tarefas, pool)
+        finally:
+            if fluxos is not None:
+                fluxos.liberar()
+        self.num_avaliacoes += len(novos)
+        # com prazo, novos pode ter menos itens que tarefas: o restante fica sem fitness
+        for i, (fit, simulado, motivo) in zip(pendentes, novos):
+            self.segundos_simulados += simulado
+            self.segundos_economizados += self.sim_time * self._replicacoes_por(sementes[i]) - simulado
+            if motivo is not None:
+                self.interrompidas[motivo] += 1
+            if self.cache is not None:
+                self.cache.guardar(chaves[i], fit)
+                for j in repetidos[chaves[i]]:
+                    fits[j] = fit
+            else:
+                fits[i] = fit
+        validos = [fit for fit in fits if fit is not None]
+        if validos and (self._incumbente is None or min(validos) < self._incumbente):
+            self._incumbente = min(validos)
+        return [(fit, ind) for fit, ind in zip(fits, indivs) if fit is not None]
+
+    @staticmethod
+    def _replicacoes_por(semente):
+        return len(semente) if isinstance(semente, tuple) else 1
+
+    def _executar(self, tarefas, pool):
+        if self._prazo is None:
+            if pool is None:
+                return [self._avaliar(*tarefa) for tarefa in tarefas]
+            chunk = max(1, len(tarefas) // (self.n_workers * 4))
+            return pool.map(_avaliar_no_worker, tarefas, chunksize=chunk)
+        # com prazo: consome os resultados um a um e para assim que o tempo acaba
+        # (a primeira avaliação sempre termina, garantindo uma resposta)
+        if pool is None:
+            resultados = (self._avaliar(*tarefa) for tarefa in tarefas)
+        else:
+            resultados = pool.imap(_avaliar_no_worker, tarefas)
+        novos = []
+        for fit in resultados:
+            novos.append(fit)
+            if self.tempo_esgotado():
+                break
+        return novos
+
+    def tempo_esgotado(self):
+        return self._prazo is not None and time.monotonic() >= self._prazo
+
+    def _criar_pool(self):
+        if self.n_workers <= 1:
+            return None
+        if self.crn:
+            # workers herdam o resource tracker do processo principal; sem isso cada um
+            # subiria o seu e "limparia" na saída os blocos de FluxosChegada que anexou
+            resource_tracker.ensure_running()
+        return multiprocessing.Pool(processes=self.n_workers,
+                                    initializer=_iniciar_worker, initargs=(self,))
 
     def run(self):
-        # initialize population: list of tuples (fitness_value, individual, avg_waits)
+        inicio = time.monotonic()
+        self._prazo = inicio + self.tempo_limite if self.tempo_limite is not None else None
+        avaliacoes_antes = self.num_avaliacoes
+        self.relatorio = {'geracoes': 0, 'avaliacoes': 0, 'tempo': 0.0, 'esgotou_tempo': False}
+        self._incumbente = None
+        self.segundos_simulados = self.segundos_economizados = 0.0
+        self.interrompidas = {'pior': 0, 'convergiu': 0}
+        self.estatisticas_triagem = dict.fromkeys(self.estatisticas_triagem, 0)
+        pool = self._criar_pool()
+        try:
+            return self._evoluir(pool)
+        finally:
+            esgotou = self.tempo_esgotado()
+            if pool is not None:
+                if esgotou:
+                    # descarta avaliações ainda em andamento nos workers
+                    pool.terminate()
+                else:
+                    pool.close()
+                pool.join()
+            self.relatorio.update(avaliacoes=self.num_avaliacoes - avaliacoes_antes,
+                                  tempo=time.monotonic() - inicio, esgotou_tempo=esgotou,
+                                  segundos_simulados=self.segundos_simulados,
+                                  segundos_economizados=self.segundos_economizados,
+                                  interrompidas=dict(self.interrompidas))
+            if self.triagem is not None:
+                est = self.estatisticas_triagem
+                self.relatorio['triagem'] = dict(
+                    est, concordancia=est['concordantes'] / est['pares'] if est['pares'] else None)
+            self._prazo = None
+
+    def _populacao_inicial(self, pool):
+        # initialize population: list of tuples (fitness_value, individual)
         population = []
-        for _ in range(self.pop_size):
-            indiv = self.random_individual()
-            fit, _ = self.fitness(indiv)
-            population.append((fit, indiv))
-        # evolve
+        sem_fit = []
+        for item in self.populacao_inicial[:self.pop_size]:
+            if isinstance(item, tuple):
+                population.append((item[0], self._copiar(item[1])))
+            else:
+                sem_fit.append(self._copiar(item))
+        sem_fit.extend(self.random_individual()
+                       for _ in range(self.pop_size - len(population) - len(sem_fit)))
+        population.extend(self.avaliar_lote(sem_fit, pool))
+        return population
+
+    def _candidatos(self, n_filhos):
+        # com triagem a geração sorteia n_filhos / triagem candidatos
+        if self.triagem is None or n_filhos <= 0:
+            return n_filhos
+        return math.ceil(n_filhos / self.triagem)
+
+    def _triar(self, candidatos, n_filhos, pool):
+        """Simula só os n_filhos candidatos com melhor estimativa analítica.
+
+        Retorna [(fit, indiv)] dos simulados, como avaliar_lote. A concordância entre a
+        ordem estimada e a simulada deles vai para estatisticas_triagem.
+        """
+        mu = {vid: via.mu_chegada for vid, via in self.rede_vias.items()}
+        estimados = [fitness_analitico(self._planos(ind), mu, self.sim_time)
+                     for ind in candidatos]
+        melhores = sorted(range(len(candidatos)), key=estimados.__getitem__)[:n_filhos]
+        avaliados = self.avaliar_lote([candidatos[i] for i in melhores], pool)
+        estimado_de = {id(candidatos[i]): estimados[i] for i in melhores}
+        concordantes, pares = pares_concordantes([estimado_de[id(ind)] for _, ind in avaliados],
+                                                 [fit for fit, _ in avaliados])
+        est = self.estatisticas_triagem
+        est['candidatos'] += len(candidatos)
+        est['simulados'] += len(avaliados)
+        est['pares'] += pares
+        est['concordantes'] += concordantes
+        return avaliados
+
+    def _evoluir_lista(self, population, pool):
         for gen in range(self.generations):
-            new_pop = []
+            if self.tempo_esgotado():
+                print(f"GA tempo esgotado após {gen} gerações e {self.num_avaliacoes} avaliações")
+                break
             # elitism: keep best 2
             population.sort(key=lambda x: x[0])
-            new_pop.extend(population[:2])
-            while len(new_pop) < self.pop_size:
+            new_pop = population[:2]
+            # gera todos os filhos da geração antes de avaliar, para pontuá-los em lote
+            filhos = []
+            n_filhos = self.pop_size - len(new_pop)
+            while len(filhos) < self._candidatos(n_filhos):
                 p1 = self.tournament_select(population)
                 p2 = self.tournament_select(population)
                 child = self.crossover(p1[1], p2[1])
                 self.mutate(child)
-                fit, _ = self.fitness(child)
-                new_pop.append((fit, child))
+                filhos.append(child)
+            if self.triagem is not None:
+                new_pop.extend(self._triar(filhos, n_filhos, pool))
+            else:
+                new_pop.extend(self.avaliar_lote(filhos, pool))
             population = new_pop
+            if len(new_pop) == self.pop_size:
+                self.relatorio['geracoes'] = gen + 1
             print(f"GA gen {gen+1}/{self.generations} best fit {population[0][0]:.3f}")
+        return population
+
+    def _evoluir_matriz(self, population, pool):
+        # mesmas regras de _evoluir_lista (2 de elite, torneio binário), com os
+        # operadores aplicados à geração inteira em NumPy
+        from operadores_vetorizados import OperadoresMatriz
+        ops = OperadoresMatriz(self, self.rng.getrandbits(63))
+        P, f = ops.matriz(population)
+        for gen in range(self.generations):
+            if self.tempo_esgotado():
+                print(f"GA tempo esgotado após {gen} gerações e {self.num_avaliacoes} avaliações")
+                break
+            elite = ops.elite(f, 2)
+            n_filhos = self.pop_size - elite.size
+            C = ops.filhos(P, f, self._candidatos(n_filhos))
+            filhos = [ops.indiv(linha) for linha in C]
+            if self.triagem is not None:
+                avaliados = self._triar(filhos, n_filhos, pool)
+            else:
+                avaliados = self.avaliar_lote(filhos, pool)
+            P, f = ops.proxima(P, f, elite, avaliados)
+            if f.size == self.pop_size:
+                self.relatorio['geracoes'] = gen + 1
+            print(f"GA gen {gen+1}/{self.generations} best fit {f.min():.3f}")
+        return ops.populacao(P, f)
+
+    def _evoluir(self, pool):
+        population = self._populacao_inicial(pool)
+        # evolve
+        if self.populacao == 'matriz':
+            population = self._evoluir_matriz(population, pool)
+        else:
+            population = self._evoluir_lista(population, pool)
         # return best
         population.sort(key=lambda x: x[0])
+        self.populacao_final = population
         best_fit, best_indiv = population[0]
-        return best_indiv, best_fit
+        if self.cache is not None:
+            c = self.cache.resumo()
+            print(f"GA cache: {c['hits']} hits / {c['misses']} misses")
+        if self.corrida:
+            total = self.segundos_simulados + self.segundos_economizados
+            print(f"GA corrida: {self.segundos_economizados:.0f}s de {total:.0f}s simulados "
+                  f"economizados (pior={self.interrompidas['pior']}, "
+                  f"convergiu={self.interrompidas['convergiu']})")
+        if self.triagem is not None:
+            est = self.estatisticas_triagem
+            concordancia = est['concordantes'] / est['pares'] if est['pares'] else float('nan')
+            print(f"GA triagem: {est['simulados']} de {est['candidatos']} candidatos simulados, "
+                  f"concordância da ordem {concordancia:.0%}")
+        # populacao_final fica na forma interna (serve de populacao_inicial depois)
+        return self.decodificar(best_indiv), best_fit
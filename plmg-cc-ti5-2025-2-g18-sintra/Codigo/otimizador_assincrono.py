@@ -0,0 +1,157 @@
+# otimizador_assincrono.py
+# Otimização fora do control_thread: processos dedicados (sem disputar o GIL com o Flask)
+# consomem as contagens mais recentes e publicam planos de tempos verdes. O controle nunca
+# espera o GA: a cada ciclo publica as contagens e envia o último plano pronto.
+#
+# Com várias interseções, cada uma é otimizada independentemente (GA próprio, warm start
+# próprio). As interseções são repartidas entre n_processos workers de forma fixa, para o
+# warm start ficar sempre no mesmo processo; o prazo de cada worker é dividido entre as
+# interseções dele, então o tempo por ciclo não cresce com o tamanho do corredor enquanto
+# houver núcleos.
+import multiprocessing
+import os
+import queue
+import time
+from typing import Dict, List, Optional
+
+import metricas
+from sintra_optimizer import calcular_tempos_otimizados, EstadoOtimizador
+
+_LATENCIA = metricas.histograma("sintra_otimizador_latencia_segundos",
+                                "Da leitura das contagens ao plano pronto, por interseção")
+_TEMPO = metricas.histograma("sintra_otimizador_tempo_segundos",
+                             "Duração de cada otimização no worker")
+_AVALIACOES = metricas.histograma("sintra_otimizador_avaliacoes",
+                                  "Simulações do GA por plano (0 quando reaproveitado)",
+                                  limites=(0, 10, 20, 50, 100, 200, 500, 1000, 5000))
+
+
+def _laco_worker(entrada, saida, intersecoes, tempo_limite):
+    # warm start fica no processo do worker, um estado por interseção
+    estados = {nome: EstadoOtimizador() for nome in intersecoes}
+    prazo = tempo_limite / len(intersecoes) if tempo_limite is not None else None
+    while True:
+        item = entrada.get()
+        # só interessa a contagem mais recente: descarta pedidos que ficaram para trás
+        while item is not None:
+            try:
+                item = entrada.get_nowait()
+            except queue.Empty:
+                break
+        if item is None:
+            break
+        contagens, t_pedido = item
+        # só as interseções do pedido (as que o servidor não resolveu pela tabela)
+        for nome in contagens:
+            t0 = time.time()
+            plano = {'intersecao': nome, 'contagens': contagens[nome], 't_pedido': t_pedido,
+                     'verdes': None, 'erro': None, 'avaliacoes': 0}
+            try:
+                plano['verdes'] = calcular_tempos_otimizados(contagens[nome], tempo_limite=prazo,
+                                                             estado=estados[nome])
+                plano['avaliacoes'] = estados[nome].avaliacoes
+            except Exception as e:
+                plano['erro'] = repr(e)
+            plano['t_pronto'] = time.time()
+            plano['tempo_otimizacao'] = plano['t_pronto'] - t0
+            saida.put(plano)
+
+
+class OtimizadorAssincrono:
+    """
+    Interface do control_thread com os processos otimizadores.
+
+    intersecoes: {nome: [zonas das fases]}. publicar_contagens() nunca bloqueia;
+    plano_mais_recente(nome) devolve o último plano publicado para a interseção (ou None
+    se ainda não há nenhum). Cada plano traz 't_pedido' (quando as contagens foram
+    lidas) e 't_pronto' (quando o GA terminou). `metricas` acumula a latência da
+    otimização (pior caso entre as interseções); idade_plano() é calculada na hora.
+    """
+    def __init__(self, intersecoes: Dict[str, List[str]], tempo_limite: Optional[float] = None,
+                 n_processos: Optional[int] = None):
+        self.intersecoes = {nome: list(zonas) for nome, zonas in intersecoes.items()}
+        self.tempo_limite = tempo_limite
+        if n_processos is None:
+            n_processos = os.cpu_count() or 1
+        n_processos = max(1, min(n_processos, len(self.intersecoes)))
+        # repartição fixa (round-robin na ordem da configuração)
+        nomes = list(self.intersecoes)
+        self._grupos = [nomes[i::n_processos] for i in range(n_processos)]
+        self._entradas = [multiprocessing.Queue() for _ in self._grupos]
+        self._saida = multiprocessing.Queue()
+        self._processos = []
+        self.planos: Dict[str, Dict] = {}
+        self.metricas = {'pedidos': 0, 'planos': 0, 'erros': 0,
+                         'latencia_ultima': None, 'latencia_max': 0.0,
+                         'tempo_otimizacao_ultimo': None}
+
+    def iniciar(self):
+        for i, (grupo, entrada) in enumerate(zip(self._grupos, self._entradas)):
+            p = multiprocessing.Process(
+                target=_laco_worker, args=(entrada, self._saida, grupo, self.tempo_limite),
+                name=f"sintra-otimizador-{i}", daemon=True)
+            p.start()
+            self._processos.append(p)
+
+    def parar(self, timeout=5.0):
+        if not self._processos:
+            return
+        for entrada in self._entradas:
+            entrada.put(None)
+        for p in self._processos:
+            p.join(timeout)
+            if p.is_alive():
+                p.terminate()
+        self._processos = []
+
+    def ativo(self):
+        return bool(self._processos) and all(p.is_alive() for p in self._processos)
+
+    def publicar_contagens(self, contagens: Dict[str, Dict[str, int]]):
+        """contagens: {interseção: {zona: veículos}} lidas neste ciclo.
+
+        Pode trazer só parte das interseções: as demais não são otimizadas neste ciclo.
+        """
+        self.metricas['pedidos'] += 1
+        agora = time.time()
+        for grupo, entrada in zip(self._grupos, self._entradas):
+            pedido = {nome: contagens[nome] for nome in grupo if nome in contagens}
+            if pedido:
+                entrada.put((pedido, agora))
+
+    def _coletar(self):
+        # esvazia a fila de saída ficando com o plano mais novo de cada interseção
+        latencias = []
+        while True:
+            try:
+                plano = self._saida.get_nowait()
+            except queue.Empty:
+                break
+            latencia = plano['t_pronto'] - plano['t_pedido']
+            latencias.append(latencia)
+            self.metricas['latencia_max'] = max(self.metricas['latencia_max'], latencia)
+            self.metricas['tempo_otimizacao_ultimo'] = plano['tempo_otimizacao']
+            if metricas.ATIVO:
+                _LATENCIA.observar(latencia)
+                _TEMPO.observar(plano['tempo_otimizacao'])
+                if plano['erro'] is None:
+                    _AVALIACOES.observar(plano['avaliacoes'])
+            if plano['erro'] is not None:
+                self.metricas['erros'] += 1
+                print(f"[OPT] Erro no otimizador assíncrono ({plano['intersecao']}): {plano['erro']}")
+                continue
+            self.metricas['planos'] += 1
+            self.planos[plano['intersecao']] = plano
+        if latencias:
+            self.metricas['latencia_ultima'] = max(latencias)
+
+    def idade_plano(self, agora: Optional[float] = None) -> Optional[float]:
+        """Há quanto tempo (s) foram lidas as contagens do plano mais velho em uso."""
+        planos = list(self.planos.values())  # lido de outra thread (/metrics)
+        if not planos:
+            return None
+        return (time.time() if agora is None else agora) - min(p['t_pedido'] for p in planos)
+
+    def plano_mais_recente(self, intersecao: str) -> Optional[Dict]:
+        self._coletar()
+        return self.planos.get(intersecao)
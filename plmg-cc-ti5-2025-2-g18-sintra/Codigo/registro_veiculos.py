@@ -0,0 +1,95 @@
+# registro_veiculos.py
+# Registro dos aparelhos ativos por zona com contagem incremental.
+#
+# As contagens por zona são atualizadas a cada inserção, troca de zona e expiração, e a
+# expiração é guiada por um heap ordenado pelo instante do último ping. Assim contar e
+# limpar custam O(mudanças) em vez de varrer todos os veículos sob o lock.
+import heapq
+import threading
+import time
+from typing import Dict, Iterable, List, Optional, Tuple
+
+
+class RegistroVeiculos:
+    def __init__(self, zonas: Iterable[str], timeout: float):
+        self.zonas: List[str] = list(zonas)
+        self.timeout = timeout
+        self.lock = threading.Lock()
+        self.veiculos: Dict[str, Dict] = {}          # vid -> {"zone": ..., "ts": ...}
+        self.contagens: Dict[str, int] = {z: 0 for z in self.zonas}
+        # heap (ts, vid) com um item por ping; itens de pings superados pelo mesmo
+        # aparelho são descartados quando chegam ao topo
+        self._expiracoes: List[Tuple[float, str]] = []
+        # atribuição round-robin para aparelhos que não informam a zona; fica aqui para
+        # ser compartilhada quando o registro é servido a vários processos
+        self._proxima_zona = 0
+
+    def __len__(self):
+        return len(self.veiculos)
+
+    def atribuir_zonas(self, n: int) -> List[str]:
+        """Distribui n aparelhos sem zona entre as zonas (round-robin)."""
+        with self.lock:
+            inicio = self._proxima_zona
+            self._proxima_zona += n
+        return [self.zonas[(inicio + i) % len(self.zonas)] for i in range(n)]
+
+    def atualizar(self, vid: str, zona: str, agora: Optional[float] = None):
+        if agora is None:
+            agora = time.time()
+        with self.lock:
+            self._atualizar(vid, zona, agora)
+
+    def atualizar_lote(self, registros: Iterable[Tuple[str, str]], agora: Optional[float] = None):
+        """Aplica vários pings (vid, zona) com uma única aquisição do lock."""
+        if agora is None:
+            agora = time.time()
+        with self.lock:
+            for vid, zona in registros:
+                self._atualizar(vid, zona, agora)
+
+    def _atualizar(self, vid: str, zona: str, agora: float):
+        anterior = self.veiculos.get(vid)
+        if anterior is None:
+            self.contagens[zona] += 1
+        elif anterior["zone"] != zona:
+            self.contagens[anterior["zone"]] -= 1
+            self.contagens[zona] += 1
+        self.veiculos[vid] = {"zone": zona, "ts": agora}
+        heapq.heappush(self._expiracoes, (agora, vid))
+
+    def _expirar(self, agora: float) -> int:
+        # remove quem está sem ping há mais de timeout (mesma regra de antes:
+        # conta se agora - ts <= timeout)
+        limite = agora - self.timeout
+        heap = self._expiracoes
+        removidos = 0
+        while heap and heap[0][0] < limite:
+            ts, vid = heapq.heappop(heap)
+            v = self.veiculos.get(vid)
+            if v is not None and v["ts"] == ts:
+                del self.veiculos[vid]
+                self.contagens[v["zone"]] -= 1
+                removidos += 1
+        return removidos
+
+    def expirar(self, agora: Optional[float] = None) -> int:
+        if agora is None:
+            agora = time.time()
+        with self.lock:
+            return self._expirar(agora)
+
+    def contar(self, zona: str, agora: Optional[float] = None) -> int:
+        if agora is None:
+            agora = time.time()
+        with self.lock:
+            self._expirar(agora)
+            return self.contagens.get(zona, 0)
+
+    def contar_todas(self, agora: Optional[float] = None) -> Dict[str, int]:
+        """Contagens de todas as zonas com uma única aquisição do lock."""
+        if agora is None:
+            agora = time.time()
+        with self.lock:
+            self._expirar(agora)
+            return dict(self.contagens)
@@ -0,0 +1,164 @@
+# replay_gps.py
+# Reproduz uma gravação de pings (gravacao_gps.py, ligada com SINTRA_GRAVACAO no
+# servidor) pelo mesmo pipeline do sintra1.py, sem celulares nem rede, num relógio
+# virtual e tão rápido quanto a CPU permitir.
+#
+#   python replay_gps.py pings.sgps                          -> tabela (SINTRA_TABELA) ou cálculo simples
+#   python replay_gps.py pings.sgps --otimizador ga          -> GA síncrono a cada ciclo
+#   SINTRA_TABELA=planos.tab python replay_gps.py pings.sgps --saida replay.json
+#
+# Cada requisição gravada passa por sintra1.ingerir (validação, zona automática,
+# registro) no instante em que chegou; entre elas, o relógio virtual dispara a limpeza a
+# cada 5 s e sintra1.ciclo_controle a cada CYCLE_INTERVAL, como as threads do servidor.
+# O otimizador assíncrono e o socket dos semáforos são trocados por versões síncronas
+# (resultado reprodutível: a mesma gravação gera sempre os mesmos planos, conferidos
+# pela assinatura no fim). Mede vazão da ingestão, latência por requisição e por ciclo.
+import argparse
+import contextlib
+import hashlib
+import json
+import os
+import time
+from typing import Dict, Optional
+
+import sintra1
+from gravacao_gps import ler_pings
+from registro_veiculos import RegistroVeiculos
+from sintra_optimizer import calcular_tempos_otimizados, EstadoOtimizador
+
+INTERVALO_LIMPEZA = 5.0  # o mesmo do cleanup_thread
+
+
+class _OtimizadorVirtual:
+    """No lugar do OtimizadorAssincrono: com GA, otimiza na hora em que recebe as
+    contagens (plano pronto no mesmo instante virtual); sem GA, nunca tem plano e o ciclo
+    usa a tabela ou o cálculo simples."""
+    def __init__(self, intersecoes, com_ga: bool, seed: Optional[int]):
+        self.com_ga = com_ga
+        self.seed = seed
+        self.estados = {nome: EstadoOtimizador() for nome in intersecoes}
+        self.planos: Dict[str, Dict] = {}
+        self.agora = 0.0
+        self.otimizacoes = 0
+
+    def publicar_contagens(self, contagens):
+        if not self.com_ga:
+            return
+        for nome, cnts in contagens.items():
+            verdes = calcular_tempos_otimizados(cnts, seed=self.seed, estado=self.estados[nome])
+            self.planos[nome] = {'intersecao': nome, 'contagens': cnts, 'verdes': verdes,
+                                 'erro': None, 't_pedido': self.agora, 't_pronto': self.agora}
+            self.otimizacoes += 1
+
+    def plano_mais_recente(self, intersecao):
+        return self.planos.get(intersecao)
+
+
+class _ControladoresVirtuais:
+    """No lugar do ServidorControladores: guarda as mensagens em vez de enviar."""
+    def __init__(self):
+        self.mensagens = 0
+        self._hash = hashlib.sha1()
+
+    def publicar(self, grupo, msg):
+        self.mensagens += 1
+        self._hash.update(f"{grupo}:{msg}".encode())
+        return 0
+
+    def assinatura(self):
+        return self._hash.hexdigest()[:16]
+
+
+def _percentil(valores, q):
+    if not valores:
+        return 0.0
+    ordenados = sorted(valores)
+    return ordenados[min(len(ordenados) - 1, int(q * len(ordenados)))]
+
+
+def reproduzir(caminho, otimizador='tabela', seed: Optional[int] = 0, verboso=False):
+    """Roda a gravação inteira pelo pipeline e devolve as métricas."""
+    # estado limpo e sem efeitos externos: nada de regravar, de processos nem de socket
+    sintra1.gravador = None
+    sintra1._caminho_gravacao = None
+    sintra1.registro = sintra1.instrumentar_registro(
+        RegistroVeiculos(sintra1.ZONES, sintra1.VEHICLE_TIMEOUT))
+    virtual = _OtimizadorVirtual(sintra1.INTERSECOES, otimizador == 'ga', seed)
+    sintra1.otimizador = virtual
+    controladores = _ControladoresVirtuais()
+    sintra1.controladores = controladores
+    if otimizador == 'tabela' and sintra1.tabela is None:
+        print("[REPLAY] sem SINTRA_TABELA: os ciclos usam o cálculo simples")
+
+    lat_ingestao, lat_ciclo = [], []
+    pings = requisicoes = rejeitados = ciclos = 0
+    inicio_virtual = fim_virtual = None
+    proximo_ciclo = proxima_limpeza = None
+    saida = None if verboso else open(os.devnull, "w")
+    t_inicio = time.perf_counter()
+    with contextlib.redirect_stdout(saida) if saida else contextlib.nullcontext():
+        for ts, registros in ler_pings(caminho):
+            if inicio_virtual is None:
+                inicio_virtual = ts
+                proximo_ciclo = ts + sintra1.CYCLE_INTERVAL
+                proxima_limpeza = ts + INTERVALO_LIMPEZA
+            # eventos do relógio virtual que vencem antes desta requisição
+            while min(proximo_ciclo, proxima_limpeza) <= ts:
+                if proxima_limpeza <= proximo_ciclo:
+                    sintra1.registro.expirar(proxima_limpeza)
+                    proxima_limpeza += INTERVALO_LIMPEZA
+                else:
+                    ciclos += 1
+                    virtual.agora = proximo_ciclo
+                    t0 = time.perf_counter()
+                    sintra1.ciclo_controle(ciclos, proximo_ciclo)
+                    lat_ciclo.append(time.perf_counter() - t0)
+                    proximo_ciclo += sintra1.CYCLE_INTERVAL
+            t0 = time.perf_counter()
+            _, rej = sintra1.ingerir(registros, ts)
+            lat_ingestao.append(time.perf_counter() - t0)
+            requisicoes += 1
+            pings += len(registros)
+            rejeitados += len(rej)
+            fim_virtual = ts
+    if saida:
+        saida.close()
+    parede = time.perf_counter() - t_inicio
+    virtual_s = (fim_virtual - inicio_virtual) if requisicoes else 0.0
+    return {
+        'requisicoes': requisicoes, 'pings': pings, 'rejeitados': rejeitados,
+        'ciclos': ciclos, 'otimizacoes': virtual.otimizacoes,
+        'segundos_virtuais': virtual_s, 'segundos_reais': parede,
+        'aceleracao': virtual_s / parede if parede else 0.0,
+        'pings_por_segundo': pings / parede if parede else 0.0,
+        'ingestao_p50_us': _percentil(lat_ingestao, 0.50) * 1e6,
+        'ingestao_p99_us': _percentil(lat_ingestao, 0.99) * 1e6,
+        'ciclo_p50_ms': _percentil(lat_ciclo, 0.50) * 1e3,
+        'ciclo_p99_ms': _percentil(lat_ciclo, 0.99) * 1e3,
+        'ciclo_max_ms': max(lat_ciclo, default=0.0) * 1e3,
+        'assinatura': controladores.assinatura(),
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Replay de pings gravados pelo pipeline do SINTRA")
+    parser.add_argument('gravacao')
+    parser.add_argument('--otimizador', choices=('tabela', 'ga'), default='tabela',
+                        help="tabela: SINTRA_TABELA ou cálculo simples; ga: GA síncrono por ciclo")
+    parser.add_argument('--seed', type=int, default=0, help="semente do GA (--otimizador ga)")
+    parser.add_argument('--verboso', action='store_true', help="mostra o log de cada ciclo")
+    parser.add_argument('--saida', help="arquivo JSON onde gravar as métricas")
+    args = parser.parse_args()
+    r = reproduzir(args.gravacao, args.otimizador, args.seed, args.verboso)
+    print(f"[REPLAY] {r['requisicoes']} requisições, {r['pings']} pings "
+          f"({r['rejeitados']} rejeitados), {r['ciclos']} ciclos, {r['otimizacoes']} otimizações")
+    print(f"[REPLAY] {r['segundos_virtuais']:.0f}s gravados em {r['segundos_reais']:.2f}s "
+          f"({r['aceleracao']:,.0f}x), {r['pings_por_segundo']:,.0f} pings/s")
+    print(f"[REPLAY] ingestão p50={r['ingestao_p50_us']:.1f}us p99={r['ingestao_p99_us']:.1f}us  "
+          f"ciclo p50={r['ciclo_p50_ms']:.2f}ms p99={r['ciclo_p99_ms']:.2f}ms "
+          f"max={r['ciclo_max_ms']:.2f}ms")
+    print(f"[REPLAY] assinatura dos planos: {r['assinatura']}")
+    if args.saida:
+        with open(args.saida, 'w') as f:
+            json.dump(r, f, indent=2)
+        print(f"[REPLAY] métricas gravadas em {args.saida}")
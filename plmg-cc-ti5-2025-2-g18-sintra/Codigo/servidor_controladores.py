@@ -0,0 +1,209 @@
+# servidor_controladores.py
+# Servidor de socket para os controladores de semáforo, com vários controladores ao mesmo
+# tempo. Cada conexão assina um grupo (interseção/zona) e recebe os planos publicados
+# para ele.
+#
+# Protocolo: ao conectar, o controlador pode mandar "SUB <grupo>\n"; sem isso fica no
+# grupo padrão (compatível com o semaforo2 antigo). Os planos seguem o formato de linha
+# de sempre ("v1,v2\n").
+#
+# Um único laço com selectors atende todas as conexões sem bloquear: publicar() só
+# enfileira e acorda o laço, cada conexão tem seu buffer de envio, e um controlador lento
+# nunca segura o control_thread. Se o buffer de uma conexão passa do limite, os planos
+# antigos ainda não enviados são descartados (vale o mais recente).
+import selectors
+import socket
+import threading
+import time
+from collections import deque
+from typing import Deque, Dict, List, Set, Tuple
+
+import metricas
+
+_ENVIO = metricas.histograma("sintra_socket_envio_segundos",
+                             "Duração de cada send() para um controlador")
+
+
+class _Conexao:
+    __slots__ = ('sock', 'addr', 'grupo', 'rx', 'tx', 'enviado', 'bytes_pendentes',
+                 'observa_escrita')
+
+    def __init__(self, sock, addr, grupo):
+        self.sock = sock
+        self.addr = addr
+        self.grupo = grupo
+        self.rx = b""
+        self.tx: Deque[bytes] = deque()   # mensagens na fila de envio
+        self.enviado = 0                  # bytes já enviados de tx[0]
+        self.bytes_pendentes = 0
+        self.observa_escrita = False      # registrada com EVENT_WRITE no selector
+
+
+class ServidorControladores:
+    def __init__(self, host: str, porta: int, grupo_padrao: str,
+                 limite_buffer: int = 64 * 1024):
+        self.host = host
+        self.porta = porta
+        self.grupo_padrao = grupo_padrao
+        self.limite_buffer = limite_buffer
+        self._sel = selectors.DefaultSelector()
+        self._lock = threading.Lock()
+        self._pendentes: Deque[Tuple[str, bytes]] = deque()
+        self._grupos: Dict[str, Set[_Conexao]] = {}
+        # socketpair para acordar o select quando há plano novo
+        self._acorda_rx, self._acorda_tx = socket.socketpair()
+        self._acorda_rx.setblocking(False)
+        self._acorda_tx.setblocking(False)
+        self.metricas = {'conexoes': 0, 'enviados': 0, 'descartados': 0, 'falhas': 0}
+
+    # ---------- interface usada pelo control_thread ----------
+    def publicar(self, grupo: str, msg: str) -> int:
+        """Enfileira msg para todos os assinantes do grupo; nunca bloqueia.
+
+        Retorna quantos controladores estavam assinando o grupo no momento.
+        """
+        with self._lock:
+            self._pendentes.append((grupo, msg.encode()))
+            assinantes = len(self._grupos.get(grupo, ()))
+        try:
+            self._acorda_tx.send(b"\0")
+        except (BlockingIOError, OSError):
+            pass  # o laço já tem um aviso pendente
+        return assinantes
+
+    def assinantes(self) -> Dict[str, List[str]]:
+        with self._lock:
+            return {g: [f"{c.addr[0]}:{c.addr[1]}" for c in conns]
+                    for g, conns in self._grupos.items()}
+
+    # ---------- laço de eventos ----------
+    def servir(self):
+        servidor = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        servidor.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        servidor.bind((self.host, self.porta))
+        servidor.listen(128)
+        servidor.setblocking(False)
+        self._sel.register(servidor, selectors.EVENT_READ, None)
+        self._sel.register(self._acorda_rx, selectors.EVENT_READ, 'acorda')
+        print(f"[SOCKET] Aguardando controladores em {self.host}:{self.porta}")
+        while True:
+            for chave, eventos in self._sel.select():
+                if chave.data is None:
+                    self._aceitar(servidor)
+                elif chave.data == 'acorda':
+                    self._distribuir()
+                else:
+                    conn = chave.data
+                    if eventos & selectors.EVENT_READ:
+                        self._ler(conn)
+                    if eventos & selectors.EVENT_WRITE and conn.sock.fileno() != -1:
+                        self._escrever(conn)
+
+    def _aceitar(self, servidor):
+        try:
+            sock, addr = servidor.accept()
+        except BlockingIOError:
+            return
+        sock.setblocking(False)
+        conn = _Conexao(sock, addr, self.grupo_padrao)
+        with self._lock:
+            self._grupos.setdefault(conn.grupo, set()).add(conn)
+        self._sel.register(sock, selectors.EVENT_READ, conn)
+        self.metricas['conexoes'] += 1
+        print(f"[SOCKET] Conectado por {addr} (grupo {conn.grupo})")
+
+    def _fechar(self, conn: _Conexao, motivo: str):
+        print(f"[SOCKET] {conn.addr} desconectado: {motivo}")
+        with self._lock:
+            self._grupos.get(conn.grupo, set()).discard(conn)
+        try:
+            self._sel.unregister(conn.sock)
+        except (KeyError, ValueError):
+            pass
+        try:
+            conn.sock.close()
+        except OSError:
+            pass
+
+    def _ler(self, conn: _Conexao):
+        try:
+            data = conn.sock.recv(4096)
+        except BlockingIOError:
+            return
+        except OSError as e:
+            self._fechar(conn, f"erro de leitura: {e}")
+            return
+        if not data:
+            self._fechar(conn, "conexão encerrada")
+            return
+        conn.rx += data
+        while b"\n" in conn.rx:
+            linha, conn.rx = conn.rx.split(b"\n", 1)
+            texto = linha.decode(errors='ignore').strip()
+            if texto.upper().startswith("SUB "):
+                grupo = texto[4:].strip()
+                with self._lock:
+                    self._grupos.get(conn.grupo, set()).discard(conn)
+                    conn.grupo = grupo
+                    self._grupos.setdefault(grupo, set()).add(conn)
+                print(f"[SOCKET] {conn.addr} assinou o grupo {grupo}")
+            elif texto:
+                print(f"[SOCKET RX] {conn.addr}: {texto}")
+
+    def _distribuir(self):
+        try:
+            while self._acorda_rx.recv(4096):
+                pass
+        except (BlockingIOError, OSError):
+            pass
+        with self._lock:
+            pendentes = list(self._pendentes)
+            self._pendentes.clear()
+            destinos = [(msg, list(self._grupos.get(grupo, ()))) for grupo, msg in pendentes]
+        for msg, conns in destinos:
+            for conn in conns:
+                self._enfileirar(conn, msg)
+
+    def _enfileirar(self, conn: _Conexao, msg: bytes):
+        if conn.sock.fileno() == -1:
+            return  # fechada durante esta mesma distribuição
+        conn.tx.append(msg)
+        conn.bytes_pendentes += len(msg)
+        # backpressure: descarta planos antigos ainda não enviados, preservando a
+        # mensagem em envio parcial (se houver) e a mais nova
+        while conn.bytes_pendentes > self.limite_buffer and len(conn.tx) > (2 if conn.enviado else 1):
+            i = 1 if conn.enviado else 0
+            conn.bytes_pendentes -= len(conn.tx[i])
+            del conn.tx[i]
+            self.metricas['descartados'] += 1
+        self._escrever(conn)
+
+    def _escrever(self, conn: _Conexao):
+        while conn.tx:
+            atual = conn.tx[0]
+            try:
+                if metricas.ATIVO:
+                    t0 = time.perf_counter()
+                    n = conn.sock.send(atual[conn.enviado:])
+                    _ENVIO.observar(time.perf_counter() - t0)
+                else:
+                    n = conn.sock.send(atual[conn.enviado:])
+            except BlockingIOError:
+                break
+            except OSError as e:
+                self.metricas['falhas'] += 1
+                self._fechar(conn, f"falha no envio: {e}")
+                return
+            conn.enviado += n
+            conn.bytes_pendentes -= n
+            if conn.enviado < len(atual):
+                break
+            conn.tx.popleft()
+            conn.enviado = 0
+            self.metricas['enviados'] += 1
+        # observa EVENT_WRITE só enquanto houver dados esperando o socket
+        quer_escrever = bool(conn.tx)
+        if quer_escrever != conn.observa_escrita:
+            eventos = selectors.EVENT_READ | (selectors.EVENT_WRITE if quer_escrever else 0)
+            self._sel.modify(conn.sock, eventos, conn)
+            conn.observa_escrita = quer_escrever
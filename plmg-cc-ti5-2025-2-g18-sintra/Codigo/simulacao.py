@@ -1,10 +1,14 @@
 # simulacao.py
 # Simulador orientado a eventos e classes de entidade (portado do artigo para Python)
+import bisect
 import heapq
 import math
 import random
+from array import array
+from collections import deque
+from multiprocessing import shared_memory
 from dataclasses import dataclass, field
-from typing import List, Dict, Optional, Tuple
+from typing import Deque, List, Dict, Optional, Sequence, Tuple
 
 # ---------- Entidades ----------
 @dataclass
@@ -39,7 +43,8 @@ class Via:
     id: str
     semaforo: Semaforo
     mu_chegada: Optional[float] = None  # média entre chegadas (s) for source
-    fila: List[float] = field(default_factory=list)  # arrival times of vehicles in queue
+    # arrival times of vehicles in queue (deque: popleft O(1) mesmo com filas de milhares)
+    fila: Deque[float] = field(default_factory=deque)
 
 @dataclass
 class Movimentacao:
@@ -47,124 +52,379 @@ class Movimentacao:
     destino: str
     prob: float = 1.0
 
-@dataclass(order=True)
-class Evento:
-    t: float
-    ordem: int
-    tipo: str
-    dados: object = field(compare=False)
+# ---------- Estatísticas de espera (memória O(1) por via) ----------
+class QuantilP2:
+    """Estimador de quantil em fluxo pelo algoritmo P² (Jain & Chlamtac, 1985).
+
+    Mantém apenas 5 marcadores, sem guardar as observações.
+    """
+    def __init__(self, p: float):
+        self.p = p
+        self.q: List[float] = []          # alturas dos marcadores
+        self.n = [0, 1, 2, 3, 4]          # posições dos marcadores
+        self.extra = 0                    # observações após as 5 iniciais
+        # posições desejadas dos marcadores internos: base + extra * incremento
+        self.ns0 = (2 * p, 4 * p, 2 + 2 * p)
+        self.dn = (p / 2, p, (1 + p) / 2)
+
+    def adicionar(self, x: float):
+        q = self.q
+        if len(q) < 5:
+            q.append(x)
+            q.sort()
+            return
+        n = self.n
+        if x < q[1]:
+            if x < q[0]:
+                q[0] = x
+            n[1] += 1; n[2] += 1; n[3] += 1
+        elif x < q[2]:
+            n[2] += 1; n[3] += 1
+        elif x < q[3]:
+            n[3] += 1
+        elif x >= q[4]:
+            q[4] = x
+        n[4] += 1
+        self.extra += 1
+        extra = self.extra
+        for i in (1, 2, 3):
+            d = self.ns0[i - 1] + extra * self.dn[i - 1] - n[i]
+            if (d >= 1 and n[i + 1] - n[i] > 1) or (d <= -1 and n[i - 1] - n[i] < -1):
+                d = 1 if d > 0 else -1
+                # interpolação parabólica; se sair do intervalo, usa a linear
+                qp = q[i] + d / (n[i + 1] - n[i - 1]) * (
+                    (n[i] - n[i - 1] + d) * (q[i + 1] - q[i]) / (n[i + 1] - n[i])
+                    + (n[i + 1] - n[i] - d) * (q[i] - q[i - 1]) / (n[i] - n[i - 1]))
+                if not q[i - 1] < qp < q[i + 1]:
+                    qp = q[i] + d * (q[i + d] - q[i]) / (n[i + d] - n[i])
+                q[i] = qp
+                n[i] += d
+
+    def valor(self) -> float:
+        q = self.q
+        if not q:
+            return 0.0
+        if len(q) < 5:
+            # poucas amostras: quantil exato das observações guardadas
+            return q[min(len(q) - 1, int(round(self.p * (len(q) - 1))))]
+        return q[2]
+
+
+class EstatisticaEspera:
+    """Acumulador online das esperas de uma via: contagem, média e variância
+    (Welford), máximo e quantis p50/p95 (P²)."""
+    def __init__(self):
+        self.n = 0
+        self.media = 0.0
+        self.m2 = 0.0
+        self.maximo = 0.0
+        self.p50 = QuantilP2(0.50)
+        self.p95 = QuantilP2(0.95)
+
+    def adicionar(self, x: float):
+        self.n += 1
+        delta = x - self.media
+        self.media += delta / self.n
+        self.m2 += delta * (x - self.media)
+        if x > self.maximo:
+            self.maximo = x
+        self.p50.adicionar(x)
+        self.p95.adicionar(x)
+
+    @property
+    def variancia(self) -> float:
+        return self.m2 / (self.n - 1) if self.n > 1 else 0.0
+
+    def resumo(self) -> Dict[str, float]:
+        var = self.variancia
+        return {'n': self.n, 'media': self.media, 'variancia': var,
+                'desvio': math.sqrt(var), 'max': self.maximo,
+                'p50': self.p50.valor(), 'p95': self.p95.valor()}
+
+# ---------- Chegadas pré-sorteadas (números aleatórios comuns) ----------
+def amostra_exponencial(rng, mu: float) -> float:
+    # Exp with mean mu: X = -mu * ln(U)
+    U = rng.random()
+    return -mu * math.log(1 - U) if U < 1 else -mu * math.log(1e-12)
+
+
+class FluxosChegada:
+    """Instantes de chegada das vias-fonte sorteados uma vez para várias simulações.
+
+    Com os mesmos fluxos, a diferença entre as esperas de dois planos reflete os tempos
+    de semáforo e não o sorteio (common random numbers). Os instantes de todas as
+    sementes e vias ficam num único bloco de float64; com compartilhar=True o bloco é
+    um SharedMemory e os workers o abrem sem cópia a partir de descritor().
+    """
+    def __init__(self, buf, n: int, indice: Dict[int, Dict[str, Tuple[int, int]]], shm=None):
+        self._shm = shm
+        self._dados = buf[:n * 8].cast('d')
+        self.indice = indice          # semente -> via -> (início, fim) no bloco
+
+    @classmethod
+    def gerar(cls, vias: Dict[str, Via], sim_time: float, sementes: Sequence[int],
+              compartilhar: bool = False) -> 'FluxosChegada':
+        tempos = array('d')
+        indice = {}
+        for semente in sementes:
+            rng = random.Random(semente)
+            faixas = {}
+            for vid, via in vias.items():
+                if via.mu_chegada is None:
+                    continue
+                inicio = len(tempos)
+                t = amostra_exponencial(rng, via.mu_chegada)
+                while t <= sim_time:
+                    tempos.append(t)
+                    t += amostra_exponencial(rng, via.mu_chegada)
+                faixas[vid] = (inicio, len(tempos))
+            indice[semente] = faixas
+        bruto = memoryview(tempos).cast('B')
+        if not compartilhar:
+            return cls(bruto, len(tempos), indice)
+        shm = shared_memory.SharedMemory(create=True, size=max(8, len(bruto)))
+        shm.buf[:len(bruto)] = bruto
+        return cls(shm.buf, len(tempos), indice, shm)
+
+    def descritor(self):
+        """Referência pequena e serializável para anexar() em outro processo."""
+        return (self._shm.name, len(self._dados), self.indice)
+
+    @classmethod
+    def anexar(cls, descritor) -> 'FluxosChegada':
+        nome, n, indice = descritor
+        shm = shared_memory.SharedMemory(name=nome)
+        return cls(shm.buf, n, indice, shm)
+
+    def chegadas(self, semente: int) -> Dict[str, memoryview]:
+        dados = self._dados
+        return {vid: dados[a:b] for vid, (a, b) in self.indice[semente].items()}
+
+    def fechar(self):
+        self._dados.release()
+        if self._shm is not None:
+            try:
+                self._shm.close()
+            except BufferError:
+                pass  # ainda há fatias em uso; o mapeamento sai com o processo
+
+    def liberar(self):
+        """Fecha e remove o bloco compartilhado (só no processo que o criou)."""
+        self.fechar()
+        if self._shm is not None:
+            self._shm.unlink()
+
+
+# Eventos são tuplas (t, ordem, codigo, indice_via): a comparação de tuplas nativa
+# ordena o heap sem __lt__ gerado e sem alocar dicts por evento.
+CHEGADA = 0
+LIBERAR = 1  # liberar marca que um veículo terminou de atravessar a via
+CHEGADA_INTERNA = 2  # veículo vindo de outra via (movimento); não gera nova chegada externa
 
 # ---------- Simulador ----------
 class Simulador:
     def __init__(self, vias: Dict[str, Via], movimentos: List[Movimentacao],
                  deslocamentos: Dict[Tuple[str,str], float],
-                 T_reage: float = 4.1, T_passa: float = 3.4, sim_time: float = 3600*24):
+                 T_reage: float = 4.1, T_passa: float = 3.4, sim_time: float = 3600*24,
+                 rng: Optional[random.Random] = None,
+                 chegadas: Optional[Dict[str, Sequence[float]]] = None):
         self.vias = vias
         self.movimentos = movimentos
         self.desloc = deslocamentos
         self.T_reage = T_reage
         self.T_passa = T_passa
         self.sim_time = sim_time
-        self.event_queue: List[Evento] = []
+        self.event_queue: List[Tuple[float, int, int, int]] = []
         self.ordem = 0
+        self.num_eventos = 0
+        self._iniciado = False
+        self.tempo = 0.0  # relógio: até onde a simulação já foi processada
+        # vias indexadas por inteiro no laço de eventos
+        self._ids: List[str] = list(vias.keys())
+        self._indice: Dict[str, int] = {vid: i for i, vid in enumerate(self._ids)}
+        self._vias: List[Via] = [vias[vid] for vid in self._ids]
+        # rng próprio (random.Random); sem ele usa o módulo random global, como antes
+        self.rng = rng if rng is not None else random
+        # chegadas externas pré-sorteadas por via (FluxosChegada.chegadas) no lugar de
+        # _exp_sample; _proxima guarda a posição de cada via no seu fluxo
+        self._fixas: List[Optional[Sequence[float]]] = [
+            chegadas.get(vid) if chegadas else None for vid in self._ids]
+        self._proxima: List[int] = [0] * len(self._ids)
         # stats
-        self.waits: Dict[str, List[float]] = {vid: [] for vid in vias}
+        self.waits: Dict[str, EstatisticaEspera] = {vid: EstatisticaEspera() for vid in vias}
+        self._waits: List[EstatisticaEspera] = [self.waits[vid] for vid in self._ids]
+        self._passados: List[int] = [0] * len(self._ids)
         self.num_passados: Dict[str, int] = {vid: 0 for vid in vias}
+        # propagação na rede: por via de origem, (probabilidades acumuladas, destinos,
+        # atrasos de deslocamento); None para vias sem movimentos (o veículo sai da rede)
+        self._saidas: List[Optional[Tuple[List[float], List[int], List[float]]]] = \
+            self._montar_saidas(movimentos, deslocamentos)
 
-    def schedule(self, t: float, tipo: str, dados):
-        heapq.heappush(self.event_queue, Evento(t, self.ordem, tipo, dados))
+    def _montar_saidas(self, movimentos, deslocamentos):
+        por_origem: Dict[int, List[Movimentacao]] = {}
+        for m in movimentos:
+            if m.origem not in self._indice or m.destino not in self._indice:
+                raise ValueError(f"movimento {m.origem}->{m.destino} com via desconhecida")
+            if m.prob > 0:
+                por_origem.setdefault(self._indice[m.origem], []).append(m)
+        saidas = [None] * len(self._ids)
+        for i, movs in por_origem.items():
+            total = sum(m.prob for m in movs)
+            # probabilidades somando menos de 1: o restante sai da rede
+            escala = 1.0 / total if total > 1.0 else 1.0
+            acumuladas, destinos, atrasos = [], [], []
+            acc = 0.0
+            for m in movs:
+                acc += m.prob * escala
+                acumuladas.append(acc)
+                destinos.append(self._indice[m.destino])
+                atrasos.append(float(deslocamentos.get((m.origem, m.destino), 0.0)))
+            saidas[i] = (acumuladas, destinos, atrasos)
+        return saidas
+
+    def schedule(self, t: float, codigo: int, indice: int):
+        heapq.heappush(self.event_queue, (t, self.ordem, codigo, indice))
         self.ordem += 1
 
     def init_sources(self):
         # generate first arrival for each source via with mu_chegada
-        for vid, via in self.vias.items():
+        for i, via in enumerate(self._vias):
             if via.mu_chegada is not None:
-                x = self._exp_sample(via.mu_chegada)
-                self.schedule(x, 'chegada', {'via': vid})
+                fixas = self._fixas[i]
+                if fixas is None:
+                    self.schedule(self._exp_sample(via.mu_chegada), CHEGADA, i)
+                elif len(fixas):
+                    self.schedule(fixas[0], CHEGADA, i)
+                    self._proxima[i] = 1
 
     def _exp_sample(self, mu):
-        # Exp with mean mu: X = -mu * ln(U)
-        U = random.random()
-        return -mu * math.log(1 - U) if U < 1 else -mu * math.log(1e-12)
+        return amostra_exponencial(self.rng, mu)
 
     def run(self):
-        self.init_sources()
-        while self.event_queue:
-            ev = heapq.heappop(self.event_queue)
-            t = ev.t
-            if t > self.sim_time:
+        self.run_ate(self.sim_time)
+        return self.resultado()
+
+    def run_ate(self, t_fim: float):
+        """Processa os eventos até t_fim (inclusive); pode ser chamado de novo com um
+        t_fim maior para continuar a mesma simulação em blocos."""
+        if not self._iniciado:
+            self._iniciado = True
+            self.init_sources()
+        fila = self.event_queue
+        pop = heapq.heappop
+        # tabela de despacho indexada pelo código do evento; local (e não atributo) para
+        # não criar ciclo de referência: o simulador é liberado assim que sai de uso,
+        # junto com as fatias de FluxosChegada que ele segura
+        tratadores = (self._chegada, self._liberar, self._chegada_interna)
+        t_fim = min(t_fim, self.sim_time)
+        n = 0
+        while fila:
+            evento = pop(fila)
+            t, _, codigo, indice = evento
+            if t > t_fim:
+                heapq.heappush(fila, evento)  # fica para o próximo bloco
                 break
-            if ev.tipo == 'chegada':
-                self.process_chegada(t, ev.dados['via'])
-            elif ev.tipo == 'liberar':
-                # liberar marca que um veículo terminou de atravessar via
-                self.process_liberar(t, ev.dados['via'])
+            n += 1
+            tratadores[codigo](t, indice)
+        self.num_eventos += n
+        self.tempo = t_fim
 
+    def resultado(self):
         # return stats
-        avg_waits = {vid: (sum(w)/len(w) if w else 0.0) for vid, w in self.waits.items()}
-        return {'avg_waits': avg_waits, 'num_passados': self.num_passados}
+        for vid, passados in zip(self._ids, self._passados):
+            self.num_passados[vid] = passados
+        avg_waits = {vid: w.media for vid, w in self.waits.items()}
+        estatisticas = {vid: w.resumo() for vid, w in self.waits.items()}
+        return {'avg_waits': avg_waits, 'num_passados': self.num_passados,
+                'estatisticas': estatisticas}
 
-    # core logic approximating article rules
+    # interface por id de via (mantida para uso fora do laço de eventos)
     def process_chegada(self, t: float, via_id: str):
-        via = self.vias[via_id]
-        # create vehicle arrival
-        arrival_time = t
-        # append to queue
-        via.fila.append(arrival_time)
+        self._chegada(t, self._indice[via_id])
+
+    def attempt_departure(self, t: float, via_id: str):
+        self._tentar_partida(t, self._indice[via_id])
+
+    def process_liberar(self, t: float, via_id: str):
+        self._liberar(t, self._indice[via_id])
+
+    # core logic approximating article rules
+    def _chegada(self, t: float, i: int):
+        via = self._vias[i]
+        # create vehicle arrival and append to queue
+        via.fila.append(t)
         # if this arrival is first in queue, attempt to depart
         if len(via.fila) == 1:
-            self.attempt_departure(t, via_id)
+            self._tentar_partida(t, i)
         # schedule next external arrival if source
         if via.mu_chegada is not None:
-            x = self._exp_sample(via.mu_chegada)
-            self.schedule(t + x, 'chegada', {'via': via_id})
+            fixas = self._fixas[i]
+            if fixas is None:
+                x = self._exp_sample(via.mu_chegada)
+                self.schedule(t + x, CHEGADA, i)
+            else:
+                k = self._proxima[i]
+                if k < len(fixas):
+                    self.schedule(fixas[k], CHEGADA, i)
+                    self._proxima[i] = k + 1
 
-    def attempt_departure(self, t: float, via_id: str):
-        via = self.vias[via_id]
+    def _chegada_interna(self, t: float, i: int):
+        fila = self._vias[i].fila
+        fila.append(t)
+        if len(fila) == 1:
+            self._tentar_partida(t, i)
+
+    def _propagar(self, t: float, i: int):
+        # veículo cruzou a linha de retenção da via i em t: sorteia o movimento e agenda
+        # a chegada no destino após o tempo de deslocamento
+        saida = self._saidas[i]
+        if saida is None:
+            return
+        acumuladas, destinos, atrasos = saida
+        k = bisect.bisect_right(acumuladas, self.rng.random())
+        if k < len(destinos):
+            self.schedule(t + atrasos[k], CHEGADA_INTERNA, destinos[k])
+
+    def _tentar_partida(self, t: float, i: int):
+        via = self._vias[i]
         sem = via.semaforo
-        # compute when previous vehicle would leave: if none, previous leave = -inf
         # We do not explicitly track last depart per via; instead we schedule 'liberar' events.
         # If semaforo is green now and this vehicle is first and no blocking, it can go.
         if sem.state_at(t) == 'verde':
-            # first vehicle has reaction time
-            leave_time = t + self.T_reage + self.T_passa
-            # schedule liberar event at leave_time (indicates this vehicle passed)
-            self.schedule(leave_time, 'liberar', {'via': via_id})
-            # record wait
-            arr = via.fila.pop(0)
-            wait = (t - arr)  # vehicle starts moving at t (when green and reacts)
-            self.waits[via_id].append(wait)
-            self.num_passados[via_id] += 1
+            # first vehicle has reaction time; liberar at leave_time indicates it passed
+            self.schedule(t + self.T_reage + self.T_passa, LIBERAR, i)
+            # record wait: vehicle starts moving at t (when green and reacts)
+            arr = via.fila.popleft()
+            self._waits[i].adicionar(t - arr)
+            self._passados[i] += 1
+            if self._saidas[i] is not None:
+                self._propagar(t + self.T_reage + self.T_passa, i)
         else:
-            # semaforo vermelho: schedule at next green + reaction time
+            # semaforo vermelho: schedule at next green + reaction time; the wait is
+            # recorded when the vehicle is popped in liberar (avoids double count)
             dt = sem.time_to_next_green(t)
-            leave_time = t + dt + self.T_reage + self.T_passa
-            self.schedule(leave_time, 'liberar', {'via': via_id})
-            # vehicle will wait until that green; record approximate wait based on leave_time - arrival_time
-            # we will record actual wait when popped in liberar
-            # to avoid double-count, mark by not popping now (pop in liberar)
-            pass
+            self.schedule(t + dt + self.T_reage + self.T_passa, LIBERAR, i)
 
-    def process_liberar(self, t: float, via_id: str):
-        via = self.vias[via_id]
-        # The organizarion: when a liberar event occurs, assume one vehicle leaves the queue (if any)
-        if via.fila:
-            arr = via.fila.pop(0)
-            # compute when it started moving: approximate as t - T_passa (it finishes at t)
-            start_move = t - self.T_passa
-            wait = max(0.0, start_move - arr)
-            self.waits[via_id].append(wait)
-            self.num_passados[via_id] += 1
+    def _liberar(self, t: float, i: int):
+        via = self._vias[i]
+        # when a liberar event occurs, assume one vehicle leaves the queue (if any)
+        fila = via.fila
+        if fila:
+            arr = fila.popleft()
+            # it started moving at t - T_passa (it finishes at t)
+            wait = t - self.T_passa - arr
+            self._waits[i].adicionar(wait if wait > 0.0 else 0.0)
+            self._passados[i] += 1
+            if self._saidas[i] is not None:
+                self._propagar(t, i)
             # After this vehicle leaves, next in queue may depart if semaforo is green at that time
-            if via.fila:
-                # immediate departure if green
-                if via.semaforo.state_at(t) == 'verde':
+            if fila:
+                sem = via.semaforo
+                if sem.state_at(t) == 'verde':
                     # next departs after T_passa from previous leave (we assume headway T_passa)
-                    next_leave = t + self.T_passa
-                    self.schedule(next_leave, 'liberar', {'via': via_id})
+                    self.schedule(t + self.T_passa, LIBERAR, i)
                 else:
                     # if red, schedule at next green + reaction + passa
-                    dt = via.semaforo.time_to_next_green(t)
-                    next_leave = t + dt + self.T_reage + self.T_passa
-                    self.schedule(next_leave, 'liberar', {'via': via_id})
+                    dt = sem.time_to_next_green(t)
+                    self.schedule(t + dt + self.T_reage + self.T_passa, LIBERAR, i)
         # else: nothing to free (could happen if external scheduling)
@@ -1,9 +1,15 @@
 # sintra_server_debug.py (VERSÃO CORRIGIDA)
-from flask import Flask, request
+from flask import Flask, Response, request, jsonify
 from flask_cors import CORS
-import threading, time, socket
+import threading, time, json, os, atexit
 
-from sintra_optimizer import calcular_tempos_otimizados
+from otimizador_assincrono import OtimizadorAssincrono
+import metricas
+from gravacao_gps import GravadorPings
+from registro_veiculos import RegistroVeiculos
+from servidor_controladores import ServidorControladores
+from sintra_optimizer import tempos_da_tabela
+from tabela_planos import TabelaPlanos
 
 app = Flask(__name__)
 CORS(app)  # permite CORS para todos os origens
@@ -14,25 +20,143 @@ SOCKET_PORT = 5000
 HTTP_PORT = 8000
 VEHICLE_TIMEOUT = 10.0
 CYCLE_INTERVAL = 8.0
+# prazo do GA por otimização: com folga, um plano novo fica pronto a cada ciclo
+OPT_TIME_BUDGET = CYCLE_INTERVAL * 0.75
+
+# interseções do corredor: nome -> zonas, na ordem das fases. Cada interseção é otimizada
+# separadamente e seus planos vão para o grupo de controladores de mesmo nome.
+# SINTRA_INTERSECOES aponta para um JSON no mesmo formato, ex. {"I1": ["S1", "S2"], ...}
+INTERSECOES_PADRAO = {"I1": ["S1", "S2"]}
+
+
+def _carregar_intersecoes():
+    caminho = os.environ.get("SINTRA_INTERSECOES")
+    if not caminho:
+        return dict(INTERSECOES_PADRAO)
+    with open(caminho, encoding="utf-8") as f:
+        intersecoes = {str(k): [str(z).strip().upper() for z in v] for k, v in json.load(f).items()}
+    zonas = [z for zs in intersecoes.values() for z in zs]
+    if not intersecoes or any(not zs for zs in intersecoes.values()):
+        raise ValueError(f"{caminho}: cada interseção precisa de ao menos uma zona")
+    if len(set(zonas)) != len(zonas):
+        raise ValueError(f"{caminho}: zona repetida entre interseções")
+    return intersecoes
+
+
+INTERSECOES = _carregar_intersecoes()
+ZONES = [z for zonas in INTERSECOES.values() for z in zonas]
+
+# aparelhos ativos com contagem incremental por zona (ver registro_veiculos.py)
+registro = RegistroVeiculos(ZONES, VEHICLE_TIMEOUT)
+
+# gravação dos pings recebidos para reprodução posterior (replay_gps.py): SINTRA_GRAVACAO
+# aponta para o arquivo (acrescenta se já existir). O arquivo só é aberto na primeira
+# ingestão, então importar o módulo (replay_gps.py, testes) não cria nem trava nada.
+_caminho_gravacao = os.environ.get("SINTRA_GRAVACAO")
+gravador = None
+_lock_gravador = threading.Lock()
+
+
+def _abrir_gravador():
+    global gravador
+    with _lock_gravador:
+        if gravador is None and _caminho_gravacao:
+            gravador = GravadorPings(_caminho_gravacao)
+            atexit.register(gravador.fechar)
+            print(f"[HTTP] Gravando pings em {_caminho_gravacao}")
+
+# tabela de planos pré-calculada (tabela_planos.py), aberta com mmap: SINTRA_TABELA aponta
+# para o arquivo. Contagens dentro da tabela são respondidas na hora, sem GA.
+_caminho_tabela = os.environ.get("SINTRA_TABELA")
+tabela = TabelaPlanos.abrir(_caminho_tabela) if _caminho_tabela else None
+if tabela is not None:
+    print(f"[OPT] Tabela de planos {_caminho_tabela}: {tabela.n_fases} fases, eixo {list(tabela.eixo)}")
+
+# GA em processos separados; o control_thread só publica contagens e lê o último plano
+otimizador = OtimizadorAssincrono(INTERSECOES, tempo_limite=OPT_TIME_BUDGET)
+
+# conexões dos semáforos: vários controladores, envio sem bloquear o control_thread.
+# Quem não manda SUB fica na primeira interseção (compatível com o semáforo2 antigo).
+controladores = ServidorControladores(SOCKET_HOST, SOCKET_PORT, grupo_padrao=next(iter(INTERSECOES)))
+
+# ---------- métricas (/metrics; SINTRA_METRICAS=0 desliga) ----------
+M_GPS = metricas.histograma("sintra_http_requisicao_segundos", "Latência das rotas de ingestão",
+                            rotulos={"rota": "/gps"})
+M_GPS_LOTE = metricas.histograma("sintra_http_requisicao_segundos", "Latência das rotas de ingestão",
+                                 rotulos={"rota": "/gps/batch"})
+M_PINGS = metricas.contador("sintra_pings_total", "Pings recebidos (aceitos e rejeitados)")
+M_REJEITADOS = metricas.contador("sintra_pings_rejeitados_total", "Pings rejeitados na validação")
+M_LOCK_ESPERA = metricas.histograma("sintra_registro_lock_espera_segundos",
+                                    "Espera para adquirir o lock do registro de veículos")
+M_LOCK_POSSE = metricas.histograma("sintra_registro_lock_posse_segundos",
+                                   "Tempo com o lock do registro de veículos")
+M_CONTAGEM = metricas.histograma("sintra_contagem_segundos",
+                                 "Contagem de todas as zonas (com expiração) no ciclo de controle")
+M_LIMPEZA = metricas.histograma("sintra_limpeza_segundos", "Expiração de aparelhos inativos")
+M_REMOVIDOS = metricas.contador("sintra_limpeza_removidos_total", "Aparelhos removidos por inatividade")
+M_CICLO = metricas.histograma("sintra_ciclo_controle_segundos", "Duração de um ciclo de controle")
+metricas.medidor("sintra_veiculos_ativos", "Aparelhos ativos no registro", lambda: len(registro))
+metricas.contador_de("sintra_otimizador_pedidos_total", "Contagens publicadas para o otimizador",
+                     lambda: otimizador.metricas['pedidos'])
+metricas.contador_de("sintra_otimizador_planos_total", "Planos recebidos do otimizador",
+                     lambda: otimizador.metricas['planos'])
+metricas.contador_de("sintra_otimizador_erros_total", "Otimizações que terminaram em erro",
+                     lambda: otimizador.metricas['erros'])
+metricas.medidor("sintra_otimizador_ativo", "1 se todos os processos do otimizador estão vivos",
+                 lambda: int(otimizador.ativo()))
+metricas.medidor("sintra_plano_idade_segundos", "Idade das contagens do plano mais velho em uso",
+                 lambda: otimizador.idade_plano())
+for _chave, _ajuda in (('enviados', "Planos enviados aos controladores"),
+                       ('descartados', "Planos descartados por backpressure"),
+                       ('falhas', "Falhas de envio (conexão fechada)"),
+                       ('conexoes', "Conexões de controladores aceitas")):
+    metricas.contador_de(f"sintra_socket_{_chave}_total", _ajuda,
+                         lambda _chave=_chave: controladores.metricas[_chave])
+for _nome in INTERSECOES:
+    metricas.medidor("sintra_controladores_conectados", "Controladores assinando a interseção",
+                     lambda _nome=_nome: len(controladores.assinantes().get(_nome, ())),
+                     rotulos={"intersecao": _nome})
+
+
+def instrumentar_registro(reg):
+    """Troca o lock do registro por um que mede espera e posse (só com métricas)."""
+    if metricas.ATIVO:
+        reg.lock = metricas.LockMedido(M_LOCK_ESPERA, M_LOCK_POSSE)
+    return reg
+
+
+def usar_registro_remoto(proxy):
+    """Aponta o servidor para o registro de outro processo (modo de produção). O lock
+    fica lá: aqui as métricas do lock ficariam sempre zeradas, então saem do /metrics."""
+    global registro
+    registro = proxy
+    metricas.remover(M_LOCK_ESPERA, M_LOCK_POSSE)
+
+
+instrumentar_registro(registro)
 
-ZONES = ["S1", "S2"]
 
-vehicles_lock = threading.Lock()
-vehicles = {}
+# -----------------------------------------------------------
+# ----------------------   HTTP /gps   ----------------------
+# -----------------------------------------------------------
 
-assign_lock = threading.Lock()
-assign_index = 0
+def _normalizar_zona(zone):
+    """Retorna (zona, erro); zona vazia fica para a atribuição automática."""
+    if not zone:
+        return None, None
+    zone = str(zone).strip().upper()
+    if zone not in ZONES:
+        return None, f"Invalid zone '{zone}'. Valid: {ZONES}"
+    return zone, None
 
-conn_lock = threading.Lock()
-conn_socket = None
-conn_addr = None
 
+def _id_valido(vid):
+    # id vem do JSON: string ou número; objetos, listas e booleanos não são ids
+    return vid is None or (isinstance(vid, (str, int, float)) and not isinstance(vid, bool))
 
-# -----------------------------------------------------------
-# ----------------------   HTTP /gps   ----------------------
-# -----------------------------------------------------------
 
 @app.route("/gps", methods=["POST"])
+@metricas.medir(M_GPS)
 def gps():
     try:
         data = request.get_json(force=True)
@@ -41,7 +165,8 @@ def gps():
         return f"Bad request: {e}", 400
 
     vid = data.get("id")
-    zone = data.get("zone")
+    if not _id_valido(vid):
+        return "Invalid id: expected a string or number", 400
 
     if not vid:
         vid = request.remote_addr
@@ -51,23 +176,111 @@ def gps():
 
     vid = str(vid).strip()
 
-    if zone:
-        zone = str(zone).strip().upper()
-        if zone not in ZONES:
-            return f"Invalid zone '{zone}'. Valid: {ZONES}", 400
-    else:
-        global assign_index
-        with assign_lock:
-            zone = ZONES[assign_index % len(ZONES)]
-            assign_index += 1
-
-    now = time.time()
-    with vehicles_lock:
-        vehicles[vid] = {"zone": zone, "ts": now}
+    _, rejeitados = ingerir([(vid, data.get("zone"))], time.time())
+    if rejeitados:
+        return rejeitados[0]["erro"], 400
 
     return "OK", 200
 
 
+def _ler_lote(corpo, mimetype, charset="utf-8"):
+    """
+    Converte o corpo do /gps/batch em uma lista de (id, zona).
+    - text/plain: uma linha por ping, "id,zona" ou só "id" (formato compacto), no
+      charset declarado no Content-Type
+    - demais: JSON, lista de {"id": ..., "zone": ...} ou {"pings": [...]}
+    Ids que não são string nem número invalidam o lote inteiro (ValueError).
+    """
+    if mimetype == "text/plain":
+        registros = []
+        for linha in corpo.decode(charset).splitlines():
+            linha = linha.strip()
+            if not linha:
+                continue
+            vid, _, zone = linha.partition(",")
+            registros.append((vid.strip(), zone.strip()))
+        return registros
+    data = json.loads(corpo)
+    if isinstance(data, dict):
+        data = data.get("pings", [])
+    if not isinstance(data, list):
+        raise ValueError("expected a JSON array of pings")
+    registros = []
+    for i, d in enumerate(data):
+        if not isinstance(d, dict):
+            registros.append((None, None))
+            continue
+        if not _id_valido(d.get("id")):
+            raise ValueError(f"ping {i}: invalid id, expected a string or number")
+        registros.append((d.get("id"), d.get("zone")))
+    return registros
+
+
+@app.route("/gps/batch", methods=["POST"])
+@metricas.medir(M_GPS_LOTE)
+def gps_batch():
+    """Vários pings por requisição (gateways), aplicados com um único lock.
+
+    Responde {"aceitos": n, "rejeitados": [{"indice": i, "erro": ...}, ...]}.
+    Diferente do /gps, registros sem id são rejeitados (o IP é do gateway).
+    """
+    try:
+        registros = _ler_lote(request.get_data(), request.mimetype,
+                              request.mimetype_params.get("charset", "utf-8"))
+    except Exception as e:
+        print(f"[HTTP] batch parse error: {e}")
+        return f"Bad request: {e}", 400
+
+    aceitos, rejeitados = ingerir(registros, time.time())
+
+    return jsonify({"aceitos": aceitos, "rejeitados": rejeitados}), 200
+
+
+def ingerir(registros, agora):
+    """Valida e aplica pings [(id, zona)] recebidos em `agora` no registro.
+
+    Caminho comum do /gps, do /gps/batch e do replay_gps.py; grava a requisição crua
+    quando a gravação está ligada. Retorna (aceitos, [{"indice": i, "erro": ...}]).
+    """
+    if gravador is None and _caminho_gravacao:
+        _abrir_gravador()
+    if gravador is not None:
+        gravador.gravar(agora, registros)
+    aceitos = []
+    sem_zona = []
+    rejeitados = []
+    for i, (vid, zone) in enumerate(registros):
+        vid = str(vid).strip() if vid is not None else ""
+        if not vid:
+            rejeitados.append({"indice": i, "erro": "Missing id"})
+            continue
+        zone, erro = _normalizar_zona(zone)
+        if erro:
+            rejeitados.append({"indice": i, "erro": erro})
+            continue
+        if zone is None:
+            sem_zona.append(len(aceitos))
+        aceitos.append([vid, zone])
+    if sem_zona:
+        for pos, zone in zip(sem_zona, registro.atribuir_zonas(len(sem_zona))):
+            aceitos[pos][1] = zone
+
+    registro.atualizar_lote(aceitos, agora)
+    if metricas.ATIVO:
+        M_PINGS.inc(len(registros))
+        if rejeitados:
+            M_REJEITADOS.inc(len(rejeitados))
+    return len(aceitos), rejeitados
+
+
+@app.route("/metrics", methods=["GET"])
+def metrics():
+    """Métricas deste processo no formato texto do Prometheus."""
+    if not metricas.ATIVO:
+        return "metricas desligadas (SINTRA_METRICAS=0)\n", 404
+    return Response(metricas.exportar(), content_type=metricas.TIPO_CONTEUDO)
+
+
 # -----------------------------------------------------------
 # ----------------------  CLEANUP THREAD ---------------------
 # -----------------------------------------------------------
@@ -75,32 +288,16 @@ def gps():
 def cleanup_thread():
     while True:
         time.sleep(5)
-        now = time.time()
-        removed = 0
-        with vehicles_lock:
-            to_remove = [vid for vid, v in vehicles.items()
-                         if now - v['ts'] > VEHICLE_TIMEOUT]
-            for vid in to_remove:
-                del vehicles[vid]
-                removed += 1
+        # expiração pelo heap de timestamps: só toca quem realmente expirou
+        t0 = time.perf_counter()
+        removed = registro.expirar(time.time())
+        if metricas.ATIVO:
+            M_LIMPEZA.observar(time.perf_counter() - t0)
+            M_REMOVIDOS.inc(removed)
         if removed:
             print(f"[CLEANUP] Removidos {removed} aparelhos inativos")
 
 
-# -----------------------------------------------------------
-# ----------------------   COUNT VEHICLES  -------------------
-# -----------------------------------------------------------
-
-def count_in_zone(zone_key):
-    now = time.time()
-    cnt = 0
-    with vehicles_lock:
-        for v in vehicles.values():
-            if now - v['ts'] <= VEHICLE_TIMEOUT and v.get("zone") == zone_key:
-                cnt += 1
-    return cnt
-
-
 # -----------------------------------------------------------
 # ----------- FUNÇÃO ANTIGA (DEIXADA COMO BACKUP) -----------
 # -----------------------------------------------------------
@@ -121,43 +318,68 @@ def compute_green_time(count):
 # -----------------------------------------------------------
 
 def control_thread():
-    global conn_socket
     cycle = 0
     while True:
         time.sleep(CYCLE_INTERVAL)
         cycle += 1
-
-        cnt_s1 = count_in_zone("S1")
-        cnt_s2 = count_in_zone("S2")
-
-        # INTEGRAÇÃO COM O OTIMIZADOR DO ARTIGO
-        try:
-            tempo_verde_s1, tempo_verde_s2 = calcular_tempos_otimizados(cnt_s1, cnt_s2)
-        except Exception as e:
-            print("[OPT] Erro na otimização, usando cálculo simples:", e)
-            tempo_verde_s1 = compute_green_time(cnt_s1)
-            tempo_verde_s2 = compute_green_time(cnt_s2)
-
-        print(f"\n[CICLO {cycle}] S1={cnt_s1} S2={cnt_s2} "
-              f"-> verdeS1={tempo_verde_s1}s  verdeS2={tempo_verde_s2}s  "
-              f"(ativos totais={len(vehicles)})")
-
-        # Envio para o semáforo2 via socket
-        with conn_lock:
-            if conn_socket:
-                try:
-                    msg = f"{int(tempo_verde_s1)},{int(tempo_verde_s2)}\n"
-                    conn_socket.send(msg.encode())
-                    print(f"[NET] Enviado para Semáforo2: {msg.strip()}")
-                except Exception as e:
-                    print(f"[NET ERROR] Falha ao enviar para Semáforo2: {e}")
-                    try:
-                        conn_socket.close()
-                    except:
-                        pass
-                    conn_socket = None
-            else:
-                print("[NET] Semáforo2 não conectado")
+        ciclo_controle(cycle, time.time())
+
+
+@metricas.medir(M_CICLO)
+def ciclo_controle(cycle, agora):
+    """Um ciclo de controle em `agora`: conta, escolhe os planos e publica.
+
+    Chamado pelo control_thread com o relógio de parede e pelo replay_gps.py com um
+    relógio virtual. Retorna {interseção: [verdes]}.
+    """
+    enviados = {}
+    t0 = time.perf_counter()
+    todas = registro.contar_todas(agora)
+    if metricas.ATIVO:
+        M_CONTAGEM.observar(time.perf_counter() - t0)
+    contagens = {nome: {z: todas[z] for z in zonas} for nome, zonas in INTERSECOES.items()}
+
+    # tabela pré-calculada primeiro; o GA assíncrono só recebe o que ficou de fora
+    da_tabela = {}
+    if tabela is not None:
+        for nome in INTERSECOES:
+            verdes = tempos_da_tabela(contagens[nome], tabela)
+            if verdes is not None:
+                da_tabela[nome] = verdes
+
+    # INTEGRAÇÃO COM O OTIMIZADOR DO ARTIGO (assíncrona: usa o plano mais recente)
+    otimizador.publicar_contagens({nome: cnts for nome, cnts in contagens.items()
+                                   if nome not in da_tabela})
+    print(f"\n[CICLO {cycle}] ativos totais={len(registro)}")
+
+    for nome, zonas in INTERSECOES.items():
+        cnts = contagens[nome]
+        plano = otimizador.plano_mais_recente(nome)
+        if nome in da_tabela:
+            verdes = [da_tabela[nome][z] for z in zonas]
+            origem = "tabela"
+        elif plano is not None:
+            verdes = [plano['verdes'][z] for z in zonas]
+            usadas = " ".join(f"{z}={plano['contagens'][z]}" for z in zonas)
+            origem = (f"plano de {usadas}, idade={agora - plano['t_pedido']:.1f}s, "
+                      f"latência={plano['t_pronto'] - plano['t_pedido']:.2f}s")
+        else:
+            # nenhum plano pronto ainda (início ou worker com erro): cálculo simples
+            verdes = [compute_green_time(cnts[z]) for z in zonas]
+            origem = "cálculo simples"
+
+        print(f"[{nome}] " + " ".join(f"{z}={cnts[z]}" for z in zonas) + " -> "
+              + "  ".join(f"verde{z}={v}s" for z, v in zip(zonas, verdes)) + f"  ({origem})")
+
+        # Envio para os semáforos da interseção (só enfileira; o laço do socket envia)
+        msg = ",".join(str(int(v)) for v in verdes) + "\n"
+        n = controladores.publicar(nome, msg)
+        if n:
+            print(f"[NET] Enviado para {n} controlador(es) de {nome}: {msg.strip()}")
+        else:
+            print(f"[NET] Nenhum controlador conectado em {nome}")
+        enviados[nome] = verdes
+    return enviados
 
 
 # -----------------------------------------------------------
@@ -165,48 +387,31 @@ def control_thread():
 # -----------------------------------------------------------
 
 def socket_server_thread():
-    global conn_socket, conn_addr
-
-    s = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-    s.bind((SOCKET_HOST, SOCKET_PORT))
-    s.listen(1)
-    print(f"[SOCKET] Aguardando conexão em {SOCKET_HOST}:{SOCKET_PORT}")
-
-    while True:
-        conn, addr = s.accept()
-        with conn_lock:
-            conn_socket = conn
-            conn_addr = addr
-        print(f"[SOCKET] Conectado por {addr}")
-
-        try:
-            while True:
-                data = conn.recv(1024)
-                if not data:
-                    break
-                print(f"[SOCKET RX] {data.decode(errors='ignore').strip()}")
-        except Exception as e:
-            print(f"[SOCKET] Conexão perdida: {e}")
-
-        with conn_lock:
-            try:
-                conn_socket.close()
-            except:
-                pass
-            conn_socket = None
-            conn_addr = None
-
-        print("[SOCKET] aguardando nova conexão...")
+    controladores.servir()
 
 
 # -----------------------------------------------------------
 # ------------------------ MAIN ------------------------------
 # -----------------------------------------------------------
 
-if __name__ == "__main__":
+def iniciar_controle():
+    """Sobe o otimizador e as threads de limpeza, socket e controle.
+
+    Usado pelo servidor de desenvolvimento (abaixo) e pelo processo de controle do
+    modo de produção (sintra_producao.py).
+    """
+    # o processo do otimizador sobe antes das threads (fork sem threads ativas)
+    otimizador.iniciar()
     threading.Thread(target=cleanup_thread, daemon=True).start()
     threading.Thread(target=socket_server_thread, daemon=True).start()
     threading.Thread(target=control_thread, daemon=True).start()
 
+
+if __name__ == "__main__":
+    iniciar_controle()
+
     print("[HTTP] iniciando Flask na porta", HTTP_PORT)
-    app.run(host="0.0.0.0", port=HTTP_PORT, debug=False)
+    try:
+        app.run(host="0.0.0.0", port=HTTP_PORT, debug=False)
+    finally:
+        otimizador.parar()
@@ -4,6 +4,8 @@ import time
 
 SERVER_HOST = "localhost"
 SERVER_PORT = 5000
+# grupo de planos que este controlador assina no servidor
+GRUPO = "I1"
 
 def semaforo2():
     while True:
@@ -11,7 +13,8 @@ def semaforo2():
             s = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
             print(f"[S2] Conectando em {SERVER_HOST}:{SERVER_PORT} ...")
             s.connect((SERVER_HOST, SERVER_PORT))
-            print("[S2] Conectado ao servidor.")
+            s.sendall(f"SUB {GRUPO}\n".encode())
+            print(f"[S2] Conectado ao servidor (grupo {GRUPO}).")
 
             buffer = ""
 
@@ -30,28 +33,21 @@ def semaforo2():
                     if not text:
                         continue
 
-                    parts = text.split(",")
-                    if len(parts) != 2:
-                        print(f"[S2] Mensagem inválida: '{text}'")
-                        continue
-
+                    # um verde por fase da interseção: "v1,v2,...,vN"
                     try:
-                        tempo_verde_s1 = int(parts[0])
-                        tempo_verde_s2 = int(parts[1])
-                    except:
+                        verdes = [int(p) for p in text.split(",")]
+                    except ValueError:
                         print(f"[S2] Erro ao interpretar valores: '{text}'")
                         continue
 
-                    print(f"[S2] Semáforo 1 VERDE {tempo_verde_s1}s → S2 fica VERMELHO")
-                    time.sleep(tempo_verde_s1)
-
-                    print(f"[S2] AGORA S2 abre por {tempo_verde_s2}s")
-                    time.sleep(tempo_verde_s2)
+                    for fase, verde in enumerate(verdes, start=1):
+                        print(f"[S2] Fase {fase} VERDE por {verde}s → demais fases em VERMELHO")
+                        time.sleep(verde)
 
-                    print("[S2] S2 amarelo (3s)")
+                    print("[S2] amarelo (3s)")
                     time.sleep(3)
 
-                    print("[S2] S2 voltou para VERMELHO")
+                    print("[S2] voltou para VERMELHO")
 
         except Exception as e:
             print(f"[S2] Erro de conexão/execução: {e}. Tentando reconectar em 3s...")
@@ -1,8 +1,9 @@
 # sintra_adapter.py
 # funções de integração para converter os dados do SINTRA (ex: seus dicts / protótipos) em objetos do simulador
-from typing import Dict, Any
-from simulacao import Via, Semaforo
+from typing import Dict, Any, List, Tuple
+from simulacao import Via, Semaforo, Movimentacao
 from otimizacao import OtimizadorGA
+from ilhas import OtimizadorIlhas
 
 def build_vias_from_input(input_data: Dict[str, Any]) -> Dict[str, Via]:
     """
@@ -12,8 +13,9 @@ def build_vias_from_input(input_data: Dict[str, Any]) -> Dict[str, Via]:
          {"id": "v1", "mu_chegada": 8.8, "verde": 33, "vermelho": 22, "offset": 0},
          ...
       ],
-      "movimentos": [...],
-      "deslocamentos": {("v1","v2"): 10.0, ...}
+      "movimentos": [{"origem": "v1", "destino": "v2", "prob": 0.7}, ...],
+      "deslocamentos": {("v1","v2"): 10.0, ...},   # ou {"v1,v2": 10.0} vindo de JSON
+      "intersecoes": {"I1": ["v1", "v3"], ...}     # opcional: vias que dividem o ciclo
     }
     Retorna dict id->Via
     """
@@ -26,16 +28,75 @@ def build_vias_from_input(input_data: Dict[str, Any]) -> Dict[str, Via]:
         vias[v['id']] = Via(id=v['id'], semaforo=sem, mu_chegada=(float(mu) if mu is not None else None))
     return vias
 
+def build_movimentos_from_input(input_data: Dict[str, Any]) -> List[Movimentacao]:
+    """Aceita Movimentacao ou dicts {"origem", "destino", "prob"}."""
+    movimentos = []
+    for m in input_data.get('movimentos', []):
+        if isinstance(m, dict):
+            m = Movimentacao(origem=m['origem'], destino=m['destino'],
+                             prob=float(m.get('prob', 1.0)))
+        movimentos.append(m)
+    return movimentos
+
+def build_deslocamentos_from_input(input_data: Dict[str, Any]) -> Dict[Tuple[str, str], float]:
+    """Chaves (origem, destino); em JSON as chaves vêm como "origem,destino"."""
+    desloc = {}
+    for chave, tempo in input_data.get('deslocamentos', {}).items():
+        if isinstance(chave, str):
+            origem, _, destino = chave.partition(",")
+            chave = (origem.strip(), destino.strip())
+        desloc[tuple(chave)] = float(tempo)
+    return desloc
+
 def otimizar_rede(input_data: Dict[str, Any], ga_params: Dict[str, Any] = None):
     vias = build_vias_from_input(input_data)
-    movimentos = input_data.get('movimentos', [])
-    desloc = input_data.get('deslocamentos', {})
+    movimentos = build_movimentos_from_input(input_data)
+    desloc = build_deslocamentos_from_input(input_data)
     ga_params = ga_params or {}
-    ga = OtimizadorGA(rede_vias=vias, desloc=desloc, movimentos=movimentos,
+    parametros = dict(rede_vias=vias, desloc=desloc, movimentos=movimentos,
                       pop_size=ga_params.get('pop_size', 30),
                       generations=ga_params.get('generations', 5),
                       mutation_rate=ga_params.get('mutation_rate', 0.05),
                       cycle_limit=ga_params.get('cycle_limit', 120),
-                      sim_time=ga_params.get('sim_time', 24*3600))
+                      sim_time=ga_params.get('sim_time', 24*3600),
+                      n_workers=ga_params.get('n_workers', 1),
+                      seed=ga_params.get('seed', None),
+                      cache_size=ga_params.get('cache_size', 0),
+                      cache_resolucao=ga_params.get('cache_resolucao', 1.0),
+                      motor=ga_params.get('motor', 'eventos'),
+                      tempo_limite=ga_params.get('tempo_limite', None),
+                      populacao_inicial=ga_params.get('populacao_inicial', None),
+                      intersecoes=input_data.get('intersecoes', None),
+                      otimizar_offsets=ga_params.get('otimizar_offsets', None),
+                      replicacoes=ga_params.get('replicacoes', 1),
+                      crn=ga_params.get('crn', False),
+                      corrida=ga_params.get('corrida', False),
+                      corrida_blocos=ga_params.get('corrida_blocos', 12),
+                      corrida_tolerancia=ga_params.get('corrida_tolerancia', 0.02),
+                      codificacao=ga_params.get('codificacao', 'verdes'),
+                      verde_min=ga_params.get('verde_min', 5.0),
+                      amarelo=ga_params.get('amarelo', 3.0),
+                      vermelho_total=ga_params.get('vermelho_total', 1.0),
+                      populacao=ga_params.get('populacao', 'lista'),
+                      triagem=ga_params.get('triagem', None))
+    # ilhas > 1: modelo de ilhas (ilhas.py), uma população por processo com migração
+    if ga_params.get('ilhas', 1) > 1:
+        ga = OtimizadorIlhas(n_ilhas=ga_params['ilhas'],
+                             intervalo_migracao=ga_params.get('intervalo_migracao', 5),
+                             migrantes=ga_params.get('migrantes', 2), **parametros)
+    else:
+        ga = OtimizadorGA(**parametros)
     best, fit = ga.run()
-    return {'best': best, 'fitness': fit}
+    # best: verdes por via e, com movimentos, offsets em best["offset:<via>"];
+    # na codificação 'fases' também os offsets de cada fase e best["ciclo:<interseção>"]
+    # relatorio: gerações completas, avaliações, tempo gasto e se o prazo acabou;
+    # também segundos simulados/economizados e interrupções da avaliação em corrida
+    # populacao: [(fit, indiv)] final, pode ser passada como populacao_inicial depois
+    # com triagem, relatorio['triagem'] traz candidatos/simulados e a concordância
+    # entre a ordem analítica e a simulada
+    # (com ilhas, relatorio traz ainda as migrações, o relatório de cada ilha e o cache)
+    res = {'best': best, 'fitness': fit, 'relatorio': ga.relatorio,
+           'populacao': ga.populacao_final}
+    if ga.cache is not None:
+        res['cache'] = ga.cache.resumo()
+    return res
@@ -1,11 +1,20 @@
 # sintra_optimizer.py
+import os
+
 from sintra_adapter import otimizar_rede
 
-def montar_input(cnt_s1, cnt_s2):
+# opções do GA escolhidas na implantação (o padrão é o comportamento original):
+#   SINTRA_CODIFICACAO=fases  ciclo + divisão de fases (os verdes enviados aos
+#                             controladores já saem sem o amarelo)
+#   SINTRA_CORRIDA=1          avaliação em corrida (candidatos piores param cedo)
+CODIFICACAO = os.environ.get("SINTRA_CODIFICACAO", "verdes")
+CORRIDA = os.environ.get("SINTRA_CORRIDA", "0") == "1"
+
+def mu_chegada(cnt):
     """
-    Transforma os contadores reais (número de veículos detectados em S1 e S2)
-    em tempos médios de chegada (mu_chegada), como no artigo.
-    
+    Transforma o contador real (número de veículos detectados na zona) em tempo
+    médio entre chegadas (mu_chegada), como no artigo.
+
     O artigo usa chegadas exponenciais:
         mu = 1 / λ
     λ depende do fluxo observado.
@@ -13,43 +22,126 @@ def montar_input(cnt_s1, cnt_s2):
     mais veículos → intervalo médio menor.
     """
     # evitar divisão por zero
-    mu_s1 = 30 if cnt_s1 == 0 else max(3, 40 / cnt_s1)
-    mu_s2 = 30 if cnt_s2 == 0 else max(3, 40 / cnt_s2)
+    return 30 if cnt == 0 else max(3, 40 / cnt)
+
 
+def montar_input(contagens):
+    """
+    Monta a entrada do simulador para uma interseção.
+    contagens: {zona: veículos}, na ordem das fases da interseção (uma via por zona).
+    """
     input_data = {
         "vias": [
-            {"id": "S1", "mu_chegada": mu_s1, "verde": 10, "vermelho": 10},
-            {"id": "S2", "mu_chegada": mu_s2, "verde": 10, "vermelho": 10},
+            {"id": zona, "mu_chegada": mu_chegada(cnt), "verde": 10, "vermelho": 10}
+            for zona, cnt in contagens.items()
         ],
 
         # Sem movimentos / rede simples
         "movimentos": [],
         "deslocamentos": {}
     }
-    
+
     return input_data
 
 
-def calcular_tempos_otimizados(cnt_s1, cnt_s2):
+class EstadoOtimizador:
     """
-    Integra o SINTRA às funções do artigo.
+    Estado mantido entre ciclos de controle (warm start).
+
+    Guarda a entrada e a população final do último GA: se a entrada não mudou, o
+    resultado anterior é reaproveitado sem nenhuma simulação; se mudou, os melhores
+    indivíduos anteriores entram como sementes da nova população.
     """
-    input_data = montar_input(cnt_s1, cnt_s2)
+    def __init__(self, n_sementes=5, geracoes_warm=2):
+        self.n_sementes = n_sementes
+        self.geracoes_warm = geracoes_warm   # gerações quando há sementes
+        self.input_data = None
+        self.populacao = []                  # [(fit, indiv)] ordenada
+        self.resultado = None                # {zona: verde}
+        self.ciclos_reaproveitados = 0
+        self.avaliacoes = 0                  # simulações do último ciclo (0 se reaproveitado)
+
+
+def parametros_ga(seed=None, tempo_limite=None):
+    """Parâmetros do GA do ciclo de controle (também usados por tabela_planos.py)."""
+    return {
+        "pop_size": 20,
+        "generations": 5,
+        "cycle_limit": 60,    # ciclo total 60s
+        "sim_time": 3600,     # simula 1h (rápido)
+        # os verdes enviados são truncados em segundos: filhos iguais nessa resolução
+        # reaproveitam o fitness já calculado
+        "cache_size": 1024,
+        "corrida": CORRIDA,
+        "codificacao": CODIFICACAO,
+        "seed": seed,
+        "tempo_limite": tempo_limite,
+    }
 
-    res = otimizar_rede(
-        input_data,
-        ga_params={
-            "pop_size": 20,
-            "generations": 5,
-            "cycle_limit": 60,    # ciclo total 60s
-            "sim_time": 3600,     # simula 1h (rápido)
-        }
-    )
+
+def verdes_controlador(best, zonas, ga_params):
+    """
+    Verde (s) de cada zona como o controlador (sintra2) executa.
+    Na codificação 'fases' o verde do plano inclui o amarelo, que o sintra2 já
+    acrescenta por conta própria: aqui sai só o verde útil.
+    """
+    amarelo = ga_params.get("amarelo", 3.0) if ga_params.get("codificacao") == "fases" else 0.0
+    return {zona: best[zona] - amarelo for zona in zonas}
+
+
+def tempos_da_tabela(contagens, tabela):
+    """
+    Tempos verdes pré-calculados ({zona: verde (s)}) para as contagens, ou None se
+    estiverem fora da tabela (TabelaPlanos de tabela_planos.py). As zonas são
+    associadas às colunas da tabela pela ordem das fases.
+    """
+    valores = tabela.consultar(list(contagens.values()))
+    if valores is None:
+        return None
+    return {zona: int(v) for zona, v in zip(contagens, valores)}
+
+
+def calcular_tempos_otimizados(contagens, seed=None, tempo_limite=None, estado=None,
+                               tabela=None):
+    """
+    Integra o SINTRA às funções do artigo, para uma interseção.
+    contagens: {zona: veículos} das fases da interseção; retorna {zona: verde (s)}.
+    seed fixa a execução do GA (útil para benchmarks e testes reprodutíveis).
+    tempo_limite (s) limita o GA: ao fim do prazo usa a melhor solução encontrada.
+    estado (EstadoOtimizador) reaproveita o ciclo anterior entre chamadas; use um
+    por interseção.
+    tabela (TabelaPlanos) responde sem GA quando as contagens estão na tabela; o GA
+    só roda fora dela.
+    """
+    input_data = montar_input(contagens)
+
+    if estado is not None and estado.resultado is not None and input_data == estado.input_data:
+        estado.ciclos_reaproveitados += 1
+        estado.avaliacoes = 0
+        return estado.resultado
+
+    if tabela is not None:
+        verdes = tempos_da_tabela(contagens, tabela)
+        if verdes is not None:
+            return verdes
+
+    ga_params = parametros_ga(seed, tempo_limite)
+    if estado is not None and estado.populacao:
+        # a entrada mudou: o fitness antigo não vale mais, só os indivíduos
+        ga_params["populacao_inicial"] = [indiv for _, indiv in estado.populacao[:estado.n_sementes]]
+        ga_params["generations"] = estado.geracoes_warm
+
+    res = otimizar_rede(input_data, ga_params=ga_params)
 
     best = res['best']
 
     # São os tempos verdes calculados pelo GA
-    tempo_verde_s1 = int(best["S1"])
-    tempo_verde_s2 = int(best["S2"])
+    verdes = {zona: int(v) for zona, v in verdes_controlador(best, contagens, ga_params).items()}
+
+    if estado is not None:
+        estado.input_data = input_data
+        estado.populacao = res['populacao']
+        estado.resultado = verdes
+        estado.avaliacoes = res['relatorio']['avaliacoes']
 
-    return tempo_verde_s1, tempo_verde_s2
+    return verdes
@@ -0,0 +1,138 @@
+# sintra_producao.py
+# Modo de produção do servidor SINTRA.
+#
+#   python sintra_producao.py --workers 4 --threads 8
+#
+# Em vez do servidor de desenvolvimento do Flask com tudo num processo só, sobe:
+#   - processo de estado: o RegistroVeiculos compartilhado (estado_compartilhado.py),
+#     servido por socket Unix local;
+#   - processo de controle: otimizador assíncrono + threads de limpeza, controle e socket
+#     dos semáforos (sintra1.iniciar_controle), lendo o registro compartilhado;
+#   - front end HTTP multi-worker (gunicorn, workers gthread) com o mesmo app Flask do
+#     sintra1.py; cada worker aponta sintra1.registro para o proxy do estado.
+# Métricas: o /metrics do front end mostra as do worker que atendeu (ingestão HTTP); as do
+# processo de controle (ciclo, otimizador, socket) ficam em --porta-metricas. O lock do
+# registro de veículos só existe no processo de estado (os outros usam proxies), então
+# espera e posse do lock ficam só em --porta-metricas-estado (os outros não as exportam).
+# Use carga_gps.py para gerar pings sintéticos contra o servidor.
+import argparse
+import multiprocessing
+import os
+import signal
+import sys
+import tempfile
+import time
+
+import metricas
+import sintra1
+from estado_compartilhado import servir_estado, conectar_registro
+
+
+# o que o processo de estado mede: só o registro (o resto herdado do sintra1 fica zerado)
+METRICAS_ESTADO = ("sintra_registro_lock_espera_segundos", "sintra_registro_lock_posse_segundos",
+                   "sintra_veiculos_ativos")
+
+
+def _processo_estado(endereco, authkey, host, porta_metricas):
+    def preparar(registro):
+        # o gauge de aparelhos ativos lê sintra1.registro
+        sintra1.registro = sintra1.instrumentar_registro(registro)
+        if metricas.ATIVO:
+            metricas.servir(host, porta_metricas, nomes=METRICAS_ESTADO)
+
+    servir_estado(endereco, authkey, sintra1.ZONES, sintra1.VEHICLE_TIMEOUT, preparar)
+
+
+def _processo_controle(endereco, authkey, host, porta_metricas):
+    # SIGTERM vira saída normal, para o multiprocessing encerrar o otimizador junto
+    signal.signal(signal.SIGTERM, lambda *_: sys.exit(0))
+    sintra1.usar_registro_remoto(conectar_registro(endereco, authkey))
+    sintra1.iniciar_controle()
+    if metricas.ATIVO:
+        metricas.servir(host, porta_metricas)
+    try:
+        while True:
+            time.sleep(3600)
+    finally:
+        # encerra os processos do GA (fila com None) antes de sair
+        sintra1.otimizador.parar()
+
+
+def _aplicacao_gunicorn(opcoes):
+    try:
+        from gunicorn.app.base import BaseApplication
+    except ImportError:
+        raise SystemExit("O modo de produção usa gunicorn: pip install gunicorn")
+
+    class AplicacaoSintra(BaseApplication):
+        def load_config(self):
+            for chave, valor in opcoes.items():
+                self.cfg.set(chave, valor)
+
+        def load(self):
+            return sintra1.app
+
+    return AplicacaoSintra()
+
+
+def _processo_http(endereco, authkey, opcoes):
+    # o gunicorn roda num processo próprio: assim os workers que ele cria (os.fork)
+    # não herdam os processos de estado e controle como filhos do multiprocessing
+    def post_worker_init(worker):
+        sintra1.usar_registro_remoto(conectar_registro(endereco, authkey))
+
+    opcoes = dict(opcoes, post_worker_init=post_worker_init)
+    _aplicacao_gunicorn(opcoes).run()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Servidor SINTRA em modo de produção")
+    parser.add_argument('--host', default="0.0.0.0")
+    parser.add_argument('--porta', type=int, default=sintra1.HTTP_PORT)
+    parser.add_argument('--workers', type=int, default=max(2, os.cpu_count() or 1))
+    parser.add_argument('--threads', type=int, default=8, help="threads por worker HTTP")
+    parser.add_argument('--porta-metricas', type=int, default=sintra1.HTTP_PORT + 1,
+                        help="/metrics do processo de controle")
+    parser.add_argument('--porta-metricas-estado', type=int, default=sintra1.HTTP_PORT + 2,
+                        help="/metrics do processo de estado (lock do registro)")
+    args = parser.parse_args()
+
+    endereco = os.path.join(tempfile.gettempdir(), f"sintra-estado-{os.getpid()}.sock")
+    authkey = os.urandom(16)
+    opcoes = {
+        'bind': f"{args.host}:{args.porta}",
+        'workers': args.workers,
+        'worker_class': 'gthread',
+        'threads': args.threads,
+    }
+
+    processos = [
+        multiprocessing.Process(target=_processo_estado, name="sintra-estado", daemon=True,
+                                args=(endereco, authkey, args.host, args.porta_metricas_estado)),
+        # controle e HTTP não são daemon: ambos criam processos filhos
+        multiprocessing.Process(target=_processo_controle, name="sintra-controle",
+                                args=(endereco, authkey, args.host, args.porta_metricas)),
+        multiprocessing.Process(target=_processo_http, name="sintra-http",
+                                args=(endereco, authkey, opcoes)),
+    ]
+    print(f"[HTTP] gunicorn em {opcoes['bind']} com {args.workers} workers x {args.threads} threads")
+    signal.signal(signal.SIGTERM, lambda *_: sys.exit(0))
+    for p in processos:
+        p.start()
+    try:
+        # supervisiona: se qualquer parte cair, derruba o resto
+        while all(p.is_alive() for p in processos):
+            time.sleep(1.0)
+        print("[PROD] um dos processos terminou, encerrando")
+    except KeyboardInterrupt:
+        pass
+    finally:
+        for p in reversed(processos):
+            p.terminate()
+            p.join(10)
+        if os.path.exists(endereco):
+            os.remove(endereco)
+
+
+if __name__ == "__main__":
+    main()
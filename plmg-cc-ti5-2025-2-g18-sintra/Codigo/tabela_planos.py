@@ -0,0 +1,204 @@
+# tabela_planos.py
+# Tabela pré-calculada de planos para o ciclo de controle.
+#
+# As contagens de uma interseção viram mu_chegada de forma determinística
+# (sintra_optimizer.mu_chegada), então o mesmo par de contagens era otimizado de novo a
+# cada ciclo. Aqui o GA roda offline, uma vez por ponto de uma grade de contagens, e o
+# resultado vai para um arquivo binário compacto que o servidor abre com mmap na
+# partida. A consulta é O(1): interpolação multilinear entre os 2^n vizinhos da grade.
+#
+#   python tabela_planos.py construir --fases 2 --eixo 0-14 --saida planos.tab --processos 8
+#   python tabela_planos.py consultar planos.tab 5 2
+#
+# Formato (little-endian): cabeçalho CABECALHO (magic, versão, n_fases, pontos no
+# eixo), os pontos do eixo (uint16) e os verdes (float32), n_fases por célula, com as
+# células em ordem lexicográfica das contagens (a última fase varia mais rápido). O
+# mesmo eixo vale para todas as fases.
+import argparse
+import contextlib
+import io
+import itertools
+import mmap
+import multiprocessing
+import os
+import struct
+import time
+from array import array
+from bisect import bisect_right
+from typing import List, Optional, Sequence
+
+from sintra_adapter import otimizar_rede
+from sintra_optimizer import montar_input, mu_chegada, parametros_ga, verdes_controlador
+
+MAGIC = b"SPLN"
+VERSAO = 1
+CABECALHO = struct.Struct("<4sHHI")
+
+
+class TabelaPlanos:
+    def __init__(self, eixo: Sequence[int], n_fases: int, valores, mm=None, arquivo=None):
+        self.eixo = tuple(eixo)
+        self.n_fases = n_fases
+        self._valores = valores       # memoryview 'f' (mmap) ou array('f')
+        self._mm = mm
+        self._arquivo = arquivo
+        # passo de cada fase no vetor de células (row-major)
+        n = len(self.eixo)
+        self._passos = [n_fases * n ** (n_fases - 1 - k) for k in range(n_fases)]
+        # acima do último ponto, mu_chegada não muda mais (satura): a contagem pode ser
+        # trazida para o último ponto sem erro. Senão fica fora da tabela.
+        self._satura = mu_chegada(self.eixo[-1]) == mu_chegada(self.eixo[-1] + 1)
+
+    # ---------- arquivo ----------
+    @classmethod
+    def abrir(cls, caminho: str) -> "TabelaPlanos":
+        arquivo = open(caminho, "rb")
+        try:
+            mm = mmap.mmap(arquivo.fileno(), 0, access=mmap.ACCESS_READ)
+        except Exception:
+            arquivo.close()
+            raise
+        magic, versao, n_fases, n_eixo = CABECALHO.unpack_from(mm, 0)
+        if magic != MAGIC or versao != VERSAO:
+            mm.close()
+            arquivo.close()
+            raise ValueError(f"{caminho}: não é uma tabela de planos (versão {VERSAO})")
+        bruto = memoryview(mm)
+        inicio = CABECALHO.size
+        eixo = bruto[inicio:inicio + 2 * n_eixo].cast("H").tolist()
+        # verdes alinhados em 4 bytes
+        inicio = (inicio + 2 * n_eixo + 3) & ~3
+        valores = bruto[inicio:inicio + 4 * n_fases * n_eixo ** n_fases].cast("f")
+        bruto.release()
+        return cls(eixo, n_fases, valores, mm, arquivo)
+
+    def gravar(self, caminho: str):
+        eixo = array("H", self.eixo)
+        cabecalho = CABECALHO.pack(MAGIC, VERSAO, self.n_fases, len(self.eixo))
+        preenchimento = -(len(cabecalho) + len(eixo) * 2) % 4
+        temporario = caminho + ".tmp"
+        with open(temporario, "wb") as f:
+            f.write(cabecalho)
+            f.write(eixo.tobytes())
+            f.write(b"\0" * preenchimento)
+            f.write(array("f", self._valores).tobytes())
+        # o servidor pode estar com a versão antiga aberta: troca atômica
+        os.replace(temporario, caminho)
+
+    def fechar(self):
+        if self._mm is not None:
+            self._valores.release()
+            self._mm.close()
+            self._arquivo.close()
+            self._mm = None
+
+    # ---------- consulta ----------
+    def consultar(self, contagens: Sequence[int]) -> Optional[List[float]]:
+        """Verdes (s) interpolados para as contagens, ou None se fora da tabela."""
+        if len(contagens) != self.n_fases:
+            return None
+        eixo = self.eixo
+        ultimo = len(eixo) - 1
+        base = 0
+        cantos = []  # (passo até o vizinho de cima, peso do vizinho de cima) por fase
+        for k, c in enumerate(contagens):
+            if c < eixo[0]:
+                return None
+            if c >= eixo[-1]:
+                if c > eixo[-1] and not self._satura:
+                    return None
+                i, t = ultimo, 0.0
+            else:
+                i = bisect_right(eixo, c) - 1
+                t = (c - eixo[i]) / (eixo[i + 1] - eixo[i])
+            base += i * self._passos[k]
+            if t > 0.0:
+                cantos.append((self._passos[k], t))
+        valores = self._valores
+        n = self.n_fases
+        resultado = [0.0] * n
+        # soma dos 2^m vizinhos (m = fases fora dos pontos da grade), peso multilinear
+        for escolha in itertools.product((0, 1), repeat=len(cantos)):
+            peso = 1.0
+            pos = base
+            for (passo, t), cima in zip(cantos, escolha):
+                if cima:
+                    peso *= t
+                    pos += passo
+                else:
+                    peso *= 1.0 - t
+            for j in range(n):
+                resultado[j] += peso * valores[pos + j]
+        return resultado
+
+
+# ---------- construção offline ----------
+def _otimizar_celula(tarefa):
+    contagens, seed, extra = tarefa
+    zonas = {f"F{k + 1}": c for k, c in enumerate(contagens)}
+    ga_params = dict(parametros_ga(seed), **extra)
+    with contextlib.redirect_stdout(io.StringIO()):
+        res = otimizar_rede(montar_input(zonas), ga_params=ga_params)
+    verdes = verdes_controlador(res['best'], zonas, ga_params)
+    return [verdes[z] for z in zonas]
+
+
+def construir(caminho: str, n_fases: int, eixo: Sequence[int], n_processos: Optional[int] = None,
+              seed: Optional[int] = 0, **extra) -> TabelaPlanos:
+    """Otimiza cada ponto da grade eixo^n_fases (em paralelo) e grava a tabela.
+
+    extra sobrescreve parametros_ga() (ex.: mais gerações, já que roda offline).
+    """
+    eixo = sorted(set(int(c) for c in eixo))
+    celulas = list(itertools.product(eixo, repeat=n_fases))
+    tarefas = [(c, seed, extra) for c in celulas]
+    valores = array("f")
+    inicio = time.time()
+    with multiprocessing.Pool(n_processos) as pool:
+        for feitas, verdes in enumerate(pool.imap(_otimizar_celula, tarefas), 1):
+            valores.extend(verdes)
+            if feitas % 50 == 0 or feitas == len(tarefas):
+                print(f"[TABELA] {feitas}/{len(tarefas)} células ({time.time() - inicio:.0f}s)")
+    tabela = TabelaPlanos(eixo, n_fases, valores)
+    tabela.gravar(caminho)
+    return tabela
+
+
+def _eixo(texto):
+    # "0-14" ou "0,1,2,4,8,14"
+    if "-" in texto and "," not in texto:
+        a, b = texto.split("-")
+        return list(range(int(a), int(b) + 1))
+    return [int(c) for c in texto.split(",")]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Tabela pré-calculada de planos do SINTRA")
+    comandos = parser.add_subparsers(dest="comando", required=True)
+    p = comandos.add_parser("construir", help="otimiza a grade de contagens e grava a tabela")
+    p.add_argument("--fases", type=int, default=2)
+    p.add_argument("--eixo", type=_eixo, default=list(range(15)),
+                   help="contagens da grade: 0-14 ou 0,1,2,4,8,14 (padrão 0-14)")
+    p.add_argument("--saida", required=True)
+    p.add_argument("--processos", type=int, default=None)
+    p.add_argument("--seed", type=int, default=0)
+    p.add_argument("--geracoes", type=int, default=None, help="gerações do GA por célula")
+    p.add_argument("--pop", type=int, default=None, help="população do GA por célula")
+    p = comandos.add_parser("consultar", help="mostra os verdes de um ponto")
+    p.add_argument("tabela")
+    p.add_argument("contagens", type=int, nargs="+")
+    args = parser.parse_args()
+    if args.comando == "construir":
+        extra = {}
+        if args.geracoes is not None:
+            extra["generations"] = args.geracoes
+        if args.pop is not None:
+            extra["pop_size"] = args.pop
+        construir(args.saida, args.fases, args.eixo, args.processos, args.seed, **extra)
+        print(f"[TABELA] gravada em {args.saida}")
+    else:
+        tabela = TabelaPlanos.abrir(args.tabela)
+        verdes = tabela.consultar(args.contagens)
+        print("fora da tabela" if verdes is None else
+              "  ".join(f"fase{k + 1}={v:.1f}s" for k, v in enumerate(verdes)))
+        tabela.fechar()
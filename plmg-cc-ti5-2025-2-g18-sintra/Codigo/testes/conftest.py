@@ -0,0 +1,9 @@
+# conftest.py
+# Os módulos do SINTRA ficam soltos em Codigo/ (sem pacote): os testes os importam
+# pelo diretório pai.
+#
+#   cd Codigo && python -m pytest testes
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
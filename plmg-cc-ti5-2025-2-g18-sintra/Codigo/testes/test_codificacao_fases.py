@@ -0,0 +1,54 @@
+# test_codificacao_fases.py
+# Todo genoma da CodificacaoFases (sorteado, cruzado ou mutado) tem de decodificar num
+# plano viável, sem passo de reparo.
+import random
+
+import pytest
+
+from otimizacao import CodificacaoFases
+
+INTERSECOES = {"I1": ["S1", "S2"], "I2": ["S3", "S4", "S5"]}
+CICLO_MAX = 120.0
+VERDE_MIN, AMARELO, VERMELHO = 5.0, 3.0, 1.0
+
+
+def _verificar(cod, g):
+    assert len(g) == cod.tamanho
+    planos = cod.planos(g)
+    for nome, inicio, vias, ciclo_min in cod.blocos:
+        ciclo = g[inicio]
+        assert ciclo_min - 1e-9 <= ciclo <= CICLO_MAX + 1e-9
+        fracoes = g[inicio + 1:inicio + 1 + len(vias)]
+        assert all(f >= 0.0 for f in fracoes)
+        assert sum(fracoes) == pytest.approx(1.0)
+        if cod.offsets:
+            assert 0.0 <= g[inicio + 1 + len(vias)] < 1.0
+        # as fases cabem no ciclo: verdes + vermelhos gerais somam o ciclo
+        soma = 0.0
+        for via in vias:
+            verde, vermelho, _ = planos[via]
+            assert verde >= VERDE_MIN + AMARELO - 1e-9
+            assert verde + vermelho == pytest.approx(ciclo)
+            soma += verde + VERMELHO
+        assert soma == pytest.approx(ciclo)
+
+
+@pytest.mark.parametrize("offsets", [False, True])
+def test_operadores_mantem_viabilidade(offsets):
+    cod = CodificacaoFases(INTERSECOES, CICLO_MAX, VERDE_MIN, AMARELO, VERMELHO, offsets)
+    rng = random.Random(7)
+    populacao = [cod.aleatorio(rng) for _ in range(20)]
+    for g in populacao:
+        _verificar(cod, g)
+    for _ in range(500):
+        p1, p2 = rng.sample(populacao, 2)
+        filho = cod.cruzar(p1, p2, rng)
+        _verificar(cod, filho)
+        cod.mutar(filho, rng)
+        _verificar(cod, filho)
+        populacao[rng.randrange(len(populacao))] = filho
+
+
+def test_ciclo_minimo_acima_do_limite():
+    with pytest.raises(ValueError):
+        CodificacaoFases({"I1": ["S1"] * 20}, CICLO_MAX, VERDE_MIN, AMARELO, VERMELHO, False)
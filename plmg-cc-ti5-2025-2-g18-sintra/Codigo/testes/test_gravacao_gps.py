@@ -0,0 +1,90 @@
+# test_gravacao_gps.py
+# Ida e volta da gravação de pings (GravadorPings -> ler_pings) e do replay: o que o
+# servidor ingeriu ao vivo é o que replay_gps.py reproduz.
+import pytest
+
+import replay_gps
+import sintra1
+from gravacao_gps import GravadorPings, ler_pings
+from registro_veiculos import RegistroVeiculos
+
+
+def test_ida_e_volta(tmp_path):
+    caminho = str(tmp_path / "pings.sgps")
+    g = GravadorPings(caminho)
+    g.gravar(100.0, [("a", "S1"), (42, None), (None, "s2")])
+    g.fechar()
+    # reabrir acrescenta no mesmo arquivo
+    g = GravadorPings(caminho)
+    g.gravar(101.25, [("çã", "S2")])
+    g.fechar()
+    assert list(ler_pings(caminho)) == [
+        (100.0, [("a", "S1"), ("42", ""), ("", "s2")]),
+        (101.25, [("çã", "S2")]),
+    ]
+
+
+def test_registro_truncado_no_fim(tmp_path):
+    caminho = str(tmp_path / "pings.sgps")
+    g = GravadorPings(caminho)
+    g.gravar(1.0, [("a", "S1")])
+    g.gravar(2.0, [("b", "S2")])
+    g.fechar()
+    with open(caminho, "r+b") as f:
+        f.truncate(f.seek(0, 2) - 3)
+    assert list(ler_pings(caminho)) == [(1.0, [("a", "S1")])]
+
+
+def test_id_longo_truncado_sem_partir_utf8(tmp_path):
+    caminho = str(tmp_path / "pings.sgps")
+    g = GravadorPings(caminho)
+    g.gravar(1.0, [("é" * 200, "S1")])
+    g.fechar()
+    [(_, [(vid, _)])] = list(ler_pings(caminho))
+    assert vid == "é" * 127
+
+
+def test_arquivo_invalido(tmp_path):
+    caminho = tmp_path / "lixo.sgps"
+    caminho.write_bytes(b"XXXXXX")
+    with pytest.raises(ValueError):
+        GravadorPings(str(caminho))
+    with pytest.raises(ValueError):
+        list(ler_pings(str(caminho)))
+
+
+@pytest.fixture
+def servidor(monkeypatch, tmp_path):
+    # estado do sintra1 restaurado no fim (o replay troca registro, otimizador etc.)
+    caminho = str(tmp_path / "pings.sgps")
+    for nome in ("otimizador", "controladores"):
+        monkeypatch.setattr(sintra1, nome, getattr(sintra1, nome))
+    monkeypatch.setattr(sintra1, "tabela", None)
+    monkeypatch.setattr(sintra1, "gravador", None)
+    monkeypatch.setattr(sintra1, "_caminho_gravacao", caminho)
+    monkeypatch.setattr(sintra1, "registro",
+                        RegistroVeiculos(sintra1.ZONES, sintra1.VEHICLE_TIMEOUT))
+    return caminho
+
+
+def test_replay_reproduz_a_ingestao(servidor):
+    lotes = [
+        (0.0, [("a", "S1"), ("b", "S2"), ("c", None)]),
+        (3.0, [("a", "S1"), ("", "S1"), ("d", "X9")]),
+        (9.0, [(f"v{i}", "S1" if i % 3 else "S2") for i in range(20)]),
+        (17.5, [("a", "S2")]),
+        (30.0, [("e", None)]),
+    ]
+    rejeitados = 0
+    for agora, registros in lotes:
+        _, rej = sintra1.ingerir(registros, agora)
+        rejeitados += len(rej)
+    sintra1.gravador.fechar()
+
+    r = replay_gps.reproduzir(servidor)
+    assert r["requisicoes"] == len(lotes)
+    assert r["pings"] == sum(len(regs) for _, regs in lotes)
+    assert r["rejeitados"] == rejeitados == 2
+    assert r["ciclos"] == 3
+    # mesma gravação, mesmos planos
+    assert replay_gps.reproduzir(servidor)["assinatura"] == r["assinatura"]
@@ -0,0 +1,67 @@
+# test_registro_veiculos.py
+# Contagens incrementais e expiração guiada pelo heap do RegistroVeiculos.
+import random
+
+from registro_veiculos import RegistroVeiculos
+
+TIMEOUT = 10.0
+
+
+def test_novo_ping_adia_a_expiracao():
+    r = RegistroVeiculos(["Z1", "Z2"], TIMEOUT)
+    r.atualizar("a", "Z1", 0.0)
+    r.atualizar("a", "Z1", 8.0)
+    # o item (0.0, "a") chega ao topo do heap, mas foi superado pelo ping de 8.0
+    assert r.expirar(15.0) == 0
+    assert r.contar_todas(15.0) == {"Z1": 1, "Z2": 0}
+    assert r.expirar(18.5) == 1
+    assert len(r) == 0
+    assert r.contar_todas(18.5) == {"Z1": 0, "Z2": 0}
+
+
+def test_limite_do_timeout_ainda_conta():
+    r = RegistroVeiculos(["Z1"], TIMEOUT)
+    r.atualizar("a", "Z1", 0.0)
+    assert r.contar("Z1", TIMEOUT) == 1
+    assert r.contar("Z1", TIMEOUT + 0.001) == 0
+
+
+def test_troca_de_zona_expira_na_zona_nova():
+    r = RegistroVeiculos(["Z1", "Z2"], TIMEOUT)
+    r.atualizar("a", "Z1", 0.0)
+    r.atualizar("a", "Z2", 5.0)
+    assert r.contar_todas(12.0) == {"Z1": 0, "Z2": 1}
+    r.expirar(16.0)
+    assert r.contar_todas(16.0) == {"Z1": 0, "Z2": 0}
+
+
+def test_expiracao_em_ordem_de_ultimo_ping():
+    r = RegistroVeiculos(["Z1", "Z2"], TIMEOUT)
+    # pings fora de ordem entre aparelhos e um lote com vários aparelhos
+    r.atualizar("c", "Z2", 3.0)
+    r.atualizar_lote([("a", "Z1"), ("b", "Z1")], 1.0)
+    r.atualizar("b", "Z2", 4.0)
+    r.atualizar("d", "Z1", 2.0)
+    vivos = []
+    for agora in (11.5, 12.5, 13.5, 14.5):
+        r.expirar(agora)
+        vivos.append(sorted(r.veiculos))
+    assert vivos == [["b", "c", "d"], ["b", "c"], ["b"], []]
+    assert r.contagens == {"Z1": 0, "Z2": 0}
+
+
+def test_contagens_batem_com_varredura():
+    rng = random.Random(3)
+    zonas = ["Z1", "Z2", "Z3"]
+    r = RegistroVeiculos(zonas, TIMEOUT)
+    agora = 0.0
+    for _ in range(2000):
+        agora += rng.random()
+        r.atualizar(f"v{rng.randrange(50)}", rng.choice(zonas), agora)
+        if rng.random() < 0.1:
+            r.expirar(agora)
+        esperado = {z: 0 for z in zonas}
+        for v in r.veiculos.values():
+            if agora - v["ts"] <= TIMEOUT:
+                esperado[v["zone"]] += 1
+        assert r.contar_todas(agora) == esperado
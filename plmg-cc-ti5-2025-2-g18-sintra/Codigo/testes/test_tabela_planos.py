@@ -0,0 +1,61 @@
+# test_tabela_planos.py
+# Interpolação multilinear da TabelaPlanos e ida e volta pelo arquivo (gravar + mmap).
+import itertools
+from array import array
+
+import pytest
+
+from tabela_planos import TabelaPlanos
+
+
+def _verdes(c1, c2):
+    # afim em cada contagem: a interpolação multilinear reproduz exatamente
+    return [10.0 + c1 + 2.0 * c2 + 0.5 * c1 * c2, 20.0 - c1]
+
+
+def _tabela(eixo):
+    valores = array("f")
+    for c1, c2 in itertools.product(eixo, repeat=2):
+        valores.extend(_verdes(c1, c2))
+    return TabelaPlanos(eixo, 2, valores)
+
+
+@pytest.mark.parametrize("contagens", [(0, 0), (2, 5), (5, 2), (1, 3), (3.5, 0.5), (4, 4)])
+def test_interpolacao(contagens):
+    t = _tabela([0, 2, 5])
+    assert t.consultar(contagens) == pytest.approx(_verdes(*contagens), rel=1e-6)
+
+
+def test_fora_da_tabela():
+    t = _tabela([0, 2, 5])
+    assert t.consultar((-1, 0)) is None
+    assert t.consultar((1,)) is None
+    # mu_chegada ainda muda acima de 5 veículos: não dá para saturar
+    assert t.consultar((6, 0)) is None
+
+
+def test_satura_acima_do_eixo():
+    # a partir de 14 veículos mu_chegada fica constante (3 s)
+    t = _tabela([0, 5, 14])
+    assert t.consultar((20, 5)) == pytest.approx(_verdes(14, 5), rel=1e-6)
+
+
+def test_ida_e_volta_pelo_arquivo(tmp_path):
+    caminho = str(tmp_path / "planos.tab")
+    original = _tabela([0, 1, 3, 7])
+    original.gravar(caminho)
+    lida = TabelaPlanos.abrir(caminho)
+    try:
+        assert lida.eixo == original.eixo
+        assert lida.n_fases == 2
+        for contagens in itertools.product([0, 0.5, 1, 2, 3, 6.25, 7], repeat=2):
+            assert lida.consultar(contagens) == pytest.approx(original.consultar(contagens))
+    finally:
+        lida.fechar()
+
+
+def test_arquivo_invalido(tmp_path):
+    caminho = tmp_path / "lixo.tab"
+    caminho.write_bytes(b"XXXX" + bytes(64))
+    with pytest.raises(ValueError):
+        TabelaPlanos.abrir(str(caminho))
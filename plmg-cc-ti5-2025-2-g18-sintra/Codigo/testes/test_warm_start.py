@@ -0,0 +1,29 @@
+# test_warm_start.py
+# Warm start do ciclo de controle (EstadoOtimizador): entrada igual reaproveita o plano
+# sem simular; entrada nova semeia o GA com a população anterior e roda menos gerações.
+from sintra_optimizer import EstadoOtimizador, calcular_tempos_otimizados
+
+
+def test_entrada_igual_reaproveita_sem_simular():
+    estado = EstadoOtimizador()
+    primeiro = calcular_tempos_otimizados({"S1": 5, "S2": 2}, seed=1, estado=estado)
+    assert estado.avaliacoes > 0
+    assert estado.ciclos_reaproveitados == 0
+
+    segundo = calcular_tempos_otimizados({"S1": 5, "S2": 2}, seed=1, estado=estado)
+    assert segundo == primeiro
+    assert estado.avaliacoes == 0
+    assert estado.ciclos_reaproveitados == 1
+
+
+def test_entrada_nova_semeia_e_roda_menos():
+    estado = EstadoOtimizador()
+    calcular_tempos_otimizados({"S1": 5, "S2": 2}, seed=1, estado=estado)
+    frio = estado.avaliacoes
+    anterior = estado.populacao
+
+    verdes = calcular_tempos_otimizados({"S1": 6, "S2": 2}, seed=1, estado=estado)
+    assert set(verdes) == {"S1", "S2"}
+    assert 0 < estado.avaliacoes < frio
+    assert estado.ciclos_reaproveitados == 0
+    assert estado.populacao is not anterior